@@ -0,0 +1,295 @@
+"""
+Balance auto-tuner for enemy stats and weapon prices.
+
+Give it a target win rate and a target gold curve per tower. It searches
+the enemy stat blocks (ENEMY_STATS) and one price scale per weapon
+catalog with a small derivative-free evolution strategy. Each generation
+is a batch of candidates, scored in parallel worker processes by playing
+seeded headless campaigns. Every candidate plays the same seeds, so a
+score only depends on the content, and scores are cached by content (in
+memory and optionally in a JSON-lines file) so revisited candidates are free.
+
+    python balance_tuner.py [generations] [workers] [targets.json]
+
+writes tuned_content.json (load it with veil_the_ruin_oop.load_content)
+and balance_report.md.
+"""
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from headless import iter_campaign
+from veil_the_ruin_oop import ENEMY_STATS, WEAPON_CATALOGS, apply_content, content_snapshot
+
+TOWERS = 20
+DEFAULT_PARTIES = [
+    [("Hero", "Vanguard")],
+    [("Hero", "Rogue"), ("Ally", "Guardian")],
+]
+STAT_FLOORS = {"health": 1, "attack": 1, "essence": 0, "gold_drop": 0}
+# Essence has no target curve, so searching it would only add noise
+TUNED_STATS = ("health", "attack", "gold_drop")
+
+
+# ==================== PARAMETER SPACE ====================
+def parameter_names():
+    """One log-scale multiplier per enemy stat and per weapon catalog's prices"""
+    names = [("enemy", kind, stat) for kind, stats in ENEMY_STATS.items()
+             for stat in stats if stat in TUNED_STATS]
+    names += [("price", wtype, None) for wtype in WEAPON_CATALOGS]
+    return names
+
+
+def build_content(base, names, x):
+    """Turn a multiplier vector into a content dict (integers, like the hand-made one)"""
+    content = {"enemies": {kind: dict(stats) for kind, stats in base["enemies"].items()},
+               "weapon_prices": {wtype: dict(prices) for wtype, prices in base["weapon_prices"].items()}}
+    for (group, key, stat), xi in zip(names, x):
+        scale = math.exp(xi)
+        if group == "enemy":
+            value = round(base["enemies"][key][stat] * scale)
+            content["enemies"][key][stat] = max(STAT_FLOORS[stat], value)
+        else:
+            prices = content["weapon_prices"][key]
+            for name, price in base["weapon_prices"][key].items():
+                prices[name] = max(1, round(price * scale))
+    return content
+
+
+def content_key(content):
+    return json.dumps(content, sort_keys=True)
+
+
+# ==================== EVALUATION ====================
+def evaluate(content, parties, seeds, max_defeats=20):
+    """Play every party x seed with this content; per-tower win rate and mean hero gold.
+
+    Runs in a worker process, so installing the content is local to it.
+    """
+    apply_content(content)
+    wins, attempts = [0] * TOWERS, [0] * TOWERS
+    gold, cleared = [0.0] * TOWERS, [0] * TOWERS
+    for party in parties:
+        for seed in seeds:
+            for record in iter_campaign(party, seed, max_defeats=max_defeats):
+                if record["kind"] != "tower":
+                    continue
+                i = record["tower"] - 1
+                attempts[i] += 1
+                if record["won"]:
+                    wins[i] += 1
+                    cleared[i] += 1
+                    gold[i] += record["party_gold"] / len(party)
+    return {
+        # A tower nobody reached counts as lost
+        "win_rate": [w / a if a else 0.0 for w, a in zip(wins, attempts)],
+        "gold": [g / c if c else 0.0 for g, c in zip(gold, cleared)],
+    }
+
+
+def loss(metrics, targets, gold_weight=0.5):
+    """Mean squared win-rate error plus weighted mean squared relative gold error"""
+    wr = sum((m - t) ** 2 for m, t in zip(metrics["win_rate"], targets["win_rate"])) / TOWERS
+    gold_targets = targets.get("gold")
+    if not gold_targets:
+        return wr
+    gd = sum(((m - t) / max(t, 1.0)) ** 2 for m, t in zip(metrics["gold"], gold_targets)) / TOWERS
+    return wr + gold_weight * gd
+
+
+def default_targets(baseline):
+    """Win rate easing from 95% at tower 1 to 55% at tower 20, gold as it is now"""
+    return {
+        "win_rate": [0.95 - 0.40 * i / (TOWERS - 1) for i in range(TOWERS)],
+        "gold": list(baseline["gold"]),
+    }
+
+
+class EvaluationCache:
+    """Content -> metrics, optionally persisted as JSON lines"""
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    key, metrics = json.loads(line)
+                    self.entries[key] = metrics
+
+    def get(self, key):
+        metrics = self.entries.get(key)
+        if metrics is not None:
+            self.hits += 1
+        return metrics
+
+    def put(self, key, metrics):
+        self.entries[key] = metrics
+        if self.path:
+            with open(self.path, "a") as f:
+                f.write(json.dumps([key, metrics]) + "\n")
+
+
+# ==================== OPTIMIZER ====================
+class EvolutionStrategy:
+    """Diagonal Gaussian search: sample a population, refit mean and spread to the best"""
+    def __init__(self, dim, sigma=0.25, population=8, elite=3, bound=math.log(3), seed=0):
+        self.mean = [0.0] * dim
+        self.sigma = [sigma] * dim
+        self.population = population
+        self.elite = elite
+        self.bound = bound
+        self.min_sigma = 0.02
+        self.rng = random.Random(seed)
+
+    def ask(self):
+        clamp = lambda v: max(-self.bound, min(self.bound, v))
+        return [[clamp(self.rng.gauss(m, s)) for m, s in zip(self.mean, self.sigma)]
+                for _ in range(self.population)]
+
+    def tell(self, xs, losses):
+        ranked = [x for _, x in sorted(zip(losses, xs), key=lambda pair: pair[0])][:self.elite]
+        for d in range(len(self.mean)):
+            column = [x[d] for x in ranked]
+            mean = sum(column) / len(column)
+            spread = math.sqrt(sum((v - mean) ** 2 for v in column) / len(column))
+            self.mean[d] = mean
+            # Blend with the old spread so one lucky generation can't collapse it
+            self.sigma[d] = max(self.min_sigma, 0.7 * self.sigma[d] + 0.3 * spread)
+
+
+class BalanceTuner:
+    """Search enemy stats and weapon prices toward target win-rate and gold curves"""
+    def __init__(self, targets=None, parties=None, seeds=range(10), workers=None,
+                 population=8, max_defeats=20, cache_path=None, seed=0):
+        self.parties = parties or DEFAULT_PARTIES
+        self.seeds = list(seeds)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_defeats = max_defeats
+        self.base = content_snapshot()
+        self.names = parameter_names()
+        self.cache = EvaluationCache(cache_path)
+        self.strategy = EvolutionStrategy(len(self.names), population=population, seed=seed)
+        self.evaluations = 0
+        self.history = []  # best loss after each generation
+        self._pool = None
+        self.baseline = self._evaluate_all([self.base])[0]
+        self.targets = targets or default_targets(self.baseline)
+        self.best = (loss(self.baseline, self.targets), self.base, self.baseline)
+
+    def _evaluate_all(self, contents):
+        """Metrics for each content, running only the ones not cached yet"""
+        keys = [content_key(c) for c in contents]
+        missing = {}
+        for key, content in zip(keys, contents):
+            if key not in missing and self.cache.get(key) is None:
+                missing[key] = content
+        if missing:
+            args = (list(missing.values()), [self.parties] * len(missing), [self.seeds] * len(missing),
+                    [self.max_defeats] * len(missing))
+            if self.workers > 1:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(self.workers)
+                results = self._pool.map(evaluate, *args)
+            else:
+                results = map(evaluate, *args)
+            for key, metrics in zip(missing, results):
+                self.cache.put(key, metrics)
+                self.evaluations += 1
+            if self.workers <= 1:
+                apply_content(self.base)  # evaluate() installed candidates in this process
+        return [self.cache.entries[key] for key in keys]
+
+    def step(self):
+        """One generation: a parallel batch of candidates, then refit the search"""
+        xs = self.strategy.ask()
+        contents = [build_content(self.base, self.names, x) for x in xs]
+        metrics = self._evaluate_all(contents)
+        losses = [loss(m, self.targets) for m in metrics]
+        self.strategy.tell(xs, losses)
+        for value, content, m in zip(losses, contents, metrics):
+            if value < self.best[0]:
+                self.best = (value, content, m)
+        self.history.append(self.best[0])
+        return self.best[0]
+
+    def run(self, generations=10, verbose=True):
+        try:
+            for g in range(generations):
+                best = self.step()
+                if verbose:
+                    print(f"generation {g + 1}/{generations}: best loss {best:.4f} "
+                          f"({self.evaluations} evaluated, {self.cache.hits} cache hits)")
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        return self.best[1]
+
+    # ---------- output ----------
+    def write_content(self, path="tuned_content.json"):
+        with open(path, "w") as f:
+            json.dump(self.best[1], f, indent=2, sort_keys=True)
+
+    def report(self):
+        best_loss, content, tuned = self.best
+        base_loss = loss(self.baseline, self.targets)
+        lines = [
+            "# Balance tuning report",
+            "",
+            f"Parties: {len(self.parties)}, seeds per party: {len(self.seeds)}, "
+            f"generations: {len(self.history)}, evaluations: {self.evaluations}, "
+            f"cache hits: {self.cache.hits}",
+            f"Loss: {base_loss:.4f} -> {best_loss:.4f}",
+            "",
+            "## Enemies",
+            "",
+            "| enemy | stat | before | after |",
+            "|---|---|---|---|",
+        ]
+        for kind, stats in content["enemies"].items():
+            for stat, value in stats.items():
+                lines.append(f"| {kind} | {stat} | {self.base['enemies'][kind][stat]} | {value} |")
+        lines += ["", "## Weapon prices", "", "| catalog | mean before | mean after |", "|---|---|---|"]
+        for wtype, prices in content["weapon_prices"].items():
+            before = self.base["weapon_prices"][wtype]
+            if prices:
+                lines.append(f"| {wtype} | {sum(before.values()) / len(before):.0f} | "
+                             f"{sum(prices.values()) / len(prices):.0f} |")
+        lines += ["", "## Towers", "",
+                  "| tower | target win | before | after | target gold | before | after |",
+                  "|---|---|---|---|---|---|---|"]
+        gold_targets = self.targets.get("gold") or [0.0] * TOWERS
+        for i in range(TOWERS):
+            lines.append(f"| {i + 1} | {self.targets['win_rate'][i]:.2f} | {self.baseline['win_rate'][i]:.2f} | "
+                         f"{tuned['win_rate'][i]:.2f} | {gold_targets[i]:.0f} | "
+                         f"{self.baseline['gold'][i]:.0f} | {tuned['gold'][i]:.0f} |")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path="balance_report.md"):
+        with open(path, "w") as f:
+            f.write(self.report())
+
+
+# ==================== CLI ====================
+def main():
+    generations = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    targets = None
+    if len(sys.argv) > 3:
+        with open(sys.argv[3]) as f:
+            targets = json.load(f)
+    start = time.perf_counter()
+    tuner = BalanceTuner(targets=targets, workers=workers, cache_path="balance_cache.jsonl")
+    tuner.run(generations)
+    tuner.write_content()
+    tuner.write_report()
+    print(f"Tuned in {time.perf_counter() - start:.1f}s -> tuned_content.json, balance_report.md")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Lockstep batched simulation of many AethermoorGame tower battles with NumPy.
+
+Every game in the batch fights the same towers with the same party, but
+state lives in (games x combatants) arrays and each game draws from its
+own counter-based RNG stream, so a game's outcome depends only on its seed
+and never on which other games share the batch.
+
+Only the battles are modelled: heroes keep their starting ATK/DEF/max HP
+for the whole campaign and collect gold and essence without spending it -
+there is no auto_shop/auto_equip step between towers. Compare against
+headless.run_campaign(..., shop=False), not against shopping campaigns.
+Targeting follows the game's defaults: heroes retarget, enemies draw from
+the heroes alive at the start of the round ("random"). A wiped party goes
+back to the tower's checkpoint, as respawn() does.
+
+    python batch_sim.py [games]          # throughput benchmark
+    python batch_sim.py check [games]    # batch vs headless means
+"""
+import sys
+import time
+
+import numpy as np
+
+from veil_the_ruin_oop import (AethermoorGame, Vanguard, Weaver, Alchemist,
+                               Rogue, Guardian)
+
+GOLD_PER_HIT = 15  # Same as AttackBehavior.execute
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(z):
+    """splitmix64 finalizer - turns a counter into 64 well mixed bits"""
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _uniform(state, n):
+    """Integers in [0, n) from already advanced stream positions (n < 2**32)"""
+    return ((_mix(state) >> np.uint64(32)) * n.astype(np.uint64) >> np.uint64(32)).astype(np.int64)
+
+
+def _draw(rng_state, rows, n):
+    """Uniform integers in [0, n) for the given games, advancing only their streams"""
+    state = rng_state[rows] + _GOLDEN
+    rng_state[rows] = state
+    return _uniform(state, n)
+
+
+class BatchCampaign:
+    """Advance K independent campaigns tower by tower in lockstep (battles only, no shop)"""
+    def __init__(self, party, games=1000, seed=0, multiplayer=None):
+        self.games = games
+        self.multiplayer = len(party) > 1 if multiplayer is None else multiplayer
+
+        # Build one real game and read the starting stats out of it
+        template = AethermoorGame(multiplayer=self.multiplayer)
+        for i, hero in enumerate(party):
+            template.add_player(hero(f"Hero{i+1}"))
+        self.template = template
+        players = template.players
+
+        self.p_max = np.array([p.attribute.health.max_value for p in players], dtype=np.int64)
+        self.p_atk = np.array([p.attribute.attack.value for p in players], dtype=np.int64)
+        self.p_def = np.array([p.attribute.defense.value for p in players], dtype=np.int64)
+
+        # k-th living hero for every alive pattern (bit j set = hero j alive)
+        heroes = len(players)
+        self._bits = (1 << np.arange(heroes)).astype(np.int64)
+        self._nth_hero = np.zeros((1 << heroes, heroes), dtype=np.int64)
+        for pattern in range(1 << heroes):
+            alive = [j for j in range(heroes) if pattern >> j & 1]
+            self._nth_hero[pattern, :len(alive)] = alive
+
+        self.towers = []
+        for tower in template.towers:
+            self.towers.append({
+                "number": tower.number,
+                "hp": np.array([e.attribute.health.value for e in tower.enemies], dtype=np.int32),
+                "atk": np.array([e.attribute.attack.value for e in tower.enemies], dtype=np.int64),
+                "def": np.array([e.attribute.defense.value for e in tower.enemies], dtype=np.int64),
+                # damage hero j deals to enemy i, and enemy i deals to hero j
+                "wound": np.array([[max(1, a - e.attribute.defense.value) for e in tower.enemies]
+                                   for a in self.p_atk], dtype=np.int64).reshape(heroes, -1),
+                "hit": np.array([[max(1, e.attribute.attack.value - d) for d in self.p_def]
+                                 for e in tower.enemies], dtype=np.int64).reshape(-1, heroes),
+                "gold": tower.calculate_tower_gold(),
+                "essence": sum(e.essence_drop for e in tower.enemies),
+            })
+
+        # One independent RNG stream per game, seeded from (seed, game index)
+        ids = np.arange(games, dtype=np.uint64)
+        self.rng_state = _mix(ids * _GOLDEN + _mix(np.full(games, seed, dtype=np.uint64)))
+        self.reset()
+
+    def reset(self):
+        shape = (self.games, len(self.p_max))
+        self.p_hp = np.broadcast_to(self.p_max, shape).copy()
+        self.p_alive = np.ones(shape, dtype=bool)
+        self.gold = np.zeros(shape, dtype=np.int64)
+        self.essence = np.zeros(shape, dtype=np.int64)
+        self.rounds = np.zeros((self.games, len(self.towers)), dtype=np.int64)
+        self.defeats = np.zeros((self.games, len(self.towers)), dtype=np.int64)
+
+    def battle_tower(self, t):
+        """Fight tower t in every game at once - mirrors AethermoorGame.battle_tower.
+
+        Games that purify the tower are written back and dropped from the
+        working arrays, so the long tail of slow battles only costs its own rows.
+        """
+        tower = self.towers[t]
+        heroes = len(self.p_max)
+        act = np.arange(self.games)  # global ids of games still fighting
+        e_hp = np.broadcast_to(tower["hp"], (act.size, len(tower["hp"]))).copy()
+        # Living enemies first, like the targeting pool: pick slot k, swap-remove on a kill
+        pool = np.broadcast_to(np.arange(len(tower["hp"]), dtype=np.int32), e_hp.shape).copy()
+        n_e = np.full(act.size, len(tower["hp"]), dtype=np.int64)
+        wound, e_hit = tower["wound"], tower["hit"]
+        e_step = np.arange(1, len(tower["hp"]) + 1, dtype=np.uint64) * _GOLDEN  # enemy i's draw
+        p_hp, p_alive = self.p_hp.copy(), self.p_alive.copy()
+        gold, essence = self.gold.copy(), self.essence.copy()
+        rng = self.rng_state.copy()
+        rounds = np.zeros(act.size, dtype=np.int64)
+        defeats = np.zeros(act.size, dtype=np.int64)
+
+        while act.size:
+            n_p = p_alive.sum(axis=1)
+
+            # Tower purified: gold for every living player, essence split in multiplayer
+            won = n_e == 0
+            if won.any():
+                gold[won] += np.where(p_alive[won], tower["gold"], 0)
+                if self.multiplayer:
+                    each = tower["essence"] // np.maximum(n_p[won], 1)
+                    essence[won] += np.where(p_alive[won], each[:, None], 0)
+                done = act[won]
+                self.p_hp[done], self.p_alive[done] = p_hp[won], p_alive[won]
+                self.gold[done], self.essence[done] = gold[won], essence[won]
+                self.rng_state[done] = rng[won]
+                self.rounds[done, t], self.defeats[done, t] = rounds[won], defeats[won]
+                keep = ~won
+                act, e_hp, pool, n_e = act[keep], e_hp[keep], pool[keep], n_e[keep]
+                p_hp, p_alive, gold, essence = p_hp[keep], p_alive[keep], gold[keep], essence[keep]
+                rng, rounds, defeats, n_p = rng[keep], rounds[keep], defeats[keep], n_p[keep]
+                if not act.size:
+                    break
+
+            # Party wiped: like respawn(), back to the tower's checkpoint - gold and
+            # essence as the party entered, full heal - and the wounded tower is
+            # fought again next round
+            acting = n_p > 0
+            lost = ~acting
+            if lost.any():
+                p_hp[lost] = self.p_max
+                p_alive[lost] = True
+                gold[lost] = self.gold[act[lost]]
+                essence[lost] = self.essence[act[lost]]
+                defeats[lost] += 1
+            rounds[acting] += 1
+            alive_p = p_alive & acting[:, None]
+            hit_rows, hit_cols = np.nonzero((e_hp > 0) & acting[:, None])
+
+            # Heroes strike in party order at a random living enemy
+            for j in range(heroes):
+                rows = np.nonzero(alive_p[:, j] & (n_e > 0))[0]
+                if rows.size == 0:
+                    continue
+                k = _draw(rng, rows, n_e[rows])
+                cols = pool[rows, k]
+                hp = np.maximum(0, e_hp[rows, cols] - wound[j, cols])
+                e_hp[rows, cols] = hp
+                gold[rows, j] += GOLD_PER_HIT
+                dead = hp == 0
+                if dead.any():
+                    rows, k, cols = rows[dead], k[dead], cols[dead]
+                    last = n_e[rows] - 1
+                    pool[rows, k] = pool[rows, last]
+                    pool[rows, last] = cols
+                    n_e[rows] = last
+
+            # Every enemy alive at the start of the round strikes back at a hero
+            # drawn from those alive now. Blows on a hero who already fell are
+            # wasted, so no draw depends on another and the phase is one pass
+            # over the living enemies; enemy i always uses stream slot i + 1.
+            k = _uniform(rng[hit_rows] + e_step[hit_cols], n_p[hit_rows])
+            rng[acting] += e_step[-1]
+            target = self._nth_hero[(p_alive @ self._bits)[hit_rows], k]
+            taken = np.bincount(hit_rows * heroes + target, weights=e_hit[hit_cols, target],
+                                minlength=act.size * heroes)
+            p_hp = np.maximum(0, p_hp - taken.reshape(act.size, heroes).astype(np.int64))
+            p_alive &= p_hp > 0
+
+    def run(self, towers=None):
+        """Play the whole campaign (or the given tower indices) and return the results"""
+        for t in (range(len(self.towers)) if towers is None else towers):
+            self.battle_tower(t)
+        return {
+            "gold": self.gold,
+            "essence": self.essence,
+            "hp": self.p_hp,
+            "rounds": self.rounds,
+            "defeats": self.defeats,
+        }
+
+
+# ==================== CHECK & BENCHMARK ====================
+def compare_with_headless(party, games=400, seed=0, tolerance=0.05):
+    """Mean defeats and gold per hero from a batch vs run_campaign(shop=False).
+
+    Returns (batch, headless) means; raises AssertionError if any of them
+    differ by more than `tolerance` relative to the headless value.
+    """
+    from headless import run_campaign
+
+    result = BatchCampaign(party, games=games, seed=seed).run()
+    batch = [result["defeats"].sum(axis=1).mean()] + list(result["gold"].mean(axis=0))
+    names = [(f"Hero{i + 1}", hero.__name__) for i, hero in enumerate(party)]
+    summaries = [run_campaign(names, seed=s, shop=False) for s in range(games)]
+    headless = [np.mean([s["defeats"] for s in summaries])]
+    headless += [np.mean([s["players"][j]["gold"] for s in summaries]) for j in range(len(party))]
+    for b, h in zip(batch, headless):
+        assert abs(b - h) <= tolerance * max(h, 1), f"batch {batch} vs headless {headless}"
+    return batch, headless
+
+
+def main():
+    if sys.argv[1:2] == ["check"]:
+        games = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+        for party in ([Vanguard], [Rogue, Guardian], [Vanguard, Weaver, Alchemist, Rogue, Guardian]):
+            batch, headless = compare_with_headless(party, games)
+            print(f"{'+'.join(h.__name__ for h in party)}: defeats {batch[0]:.2f} vs {headless[0]:.2f}, "
+                  f"gold {np.round(batch[1:]).astype(int)} vs {np.round(headless[1:]).astype(int)}")
+        return
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sim = BatchCampaign([Vanguard, Weaver, Alchemist, Rogue, Guardian], games=games, seed=1)
+    start = time.perf_counter()
+    result = sim.run()
+    elapsed = time.perf_counter() - start
+    battles = games * len(sim.towers)
+    print(f"{battles} tower battles in {elapsed:.2f}s ({battles / elapsed:,.0f}/s)")
+    print(f"Mean gold per hero: {result['gold'].mean(axis=0).round(1)}")
+    print(f"Mean defeats per campaign: {result['defeats'].sum(axis=1).mean():.2f}")
+
+
+if __name__ == "__main__":
+    main()
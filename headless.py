@@ -0,0 +1,156 @@
+"""
+Headless campaign runner - plays a full AethermoorGame with no prints or input.
+
+Shop and equip decisions come from simple automatic policies, so whole
+campaigns can be simulated in bulk (leaderboard fills, balance sweeps).
+limits caps runaway battles, e.g. {"max_rounds": 2000, "stall_window": 32}
+(see AethermoorGame.__init__); a capped battle counts as a defeat.
+on_round(game, tower) is called at every yield of game.battle_steps, to
+watch a campaign round by round (spectator.py).
+
+    python headless.py     # a runaway battle under each kind of limit
+"""
+import random
+import time
+
+from veil_the_ruin_oop import (AethermoorGame, HERO_CLASSES, Vanguard, CorruptedTower,
+                               BlightedMinion, shop_weapon_choices, get_equip_limit, equip_weapons)
+
+
+def auto_shop(player, rng=random, telemetry=None):
+    """Buy the strongest affordable offers that aren't owned yet"""
+    offers = shop_weapon_choices(player, rng)
+    for weapon in sorted(offers, key=lambda w: -w.damage):
+        if weapon.price <= player.gold and not player.inventory.owns(weapon):
+            player.buy_weapon(weapon, weapon.price)
+            if telemetry is not None:
+                telemetry.event("purchase", player=player.name, item=weapon.name,
+                                price=weapon.price, gold=player.gold)
+
+
+def auto_equip(player, tower_gold, telemetry=None):
+    """Equip the hardest-hitting owned weapons up to this tower's limit"""
+    weapons = sorted(player.inventory.weapons(), key=lambda w: -w.damage)
+    if weapons:
+        equip_weapons(player, weapons[:get_equip_limit(tower_gold)])
+        if telemetry is not None:
+            telemetry.event("equip", player=player.name, attack=player.attribute.attack.value,
+                            weapons=[w.name for w in player.inventory.equipped_weapons])
+
+
+def new_game(party, seed=None, multiplayer=None, telemetry=None, limits=None, broadcast=None):
+    """party: list of (name, class name); limits: battle limit attributes to set"""
+    multiplayer = len(party) > 1 if multiplayer is None else multiplayer
+    game = AethermoorGame(multiplayer=multiplayer, rng=random.Random(seed))
+    game.telemetry = telemetry
+    game.broadcast = broadcast
+    for name, value in (limits or {}).items():
+        if not hasattr(game, name):
+            raise AttributeError(f"unknown battle limit {name!r}")
+        setattr(game, name, value)
+    for name, pclass in party:
+        game.add_player(HERO_CLASSES.get(pclass, Vanguard)(name))
+    return game
+
+
+def _battle(game, tower, on_round):
+    """game.battle_tower(tower), calling on_round(game, tower) at every yield"""
+    if on_round is None:
+        return game.battle_tower(tower)
+    steps = game.battle_steps(tower)
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+        on_round(game, tower)
+
+
+def iter_campaign(party, seed=None, multiplayer=None, shop=True, max_defeats=100, telemetry=None,
+                  limits=None, broadcast=None, on_round=None):
+    """Play one campaign, yielding a flat record per tower battle and a final
+    "campaign" record (game.summary() plus defeats)."""
+    game = new_game(party, seed, multiplayer, telemetry, limits, broadcast)
+    rng = game.rng
+    start = time.perf_counter()
+    defeats = 0
+    while game.current_tower < len(game.towers):
+        tower = game.towers[game.current_tower]
+        if tower.cleared:
+            game.current_tower += 1
+            continue
+        won = _battle(game, tower, on_round)
+        yield {
+            "kind": "tower",
+            "seed": seed,
+            "tower": tower.number,
+            "won": won,
+            "rounds": game.last_battle_rounds,
+            "end": game.last_battle_end,
+            "alive": sum(1 for p in game.players if p.is_alive),
+            "party_hp": sum(p.attribute.health.value for p in game.players),
+            "party_gold": sum(p.gold for p in game.players),
+            "party_essence": sum(p.essence_collected for p in game.players),
+        }
+        if won:
+            tower_gold = tower.calculate_tower_gold()
+            game.current_tower += 1
+            if shop and game.current_tower < len(game.towers):
+                for player in game.players:
+                    if player.is_alive:
+                        auto_shop(player, rng, telemetry)
+                        if not game.multiplayer:
+                            auto_equip(player, tower_gold, telemetry)
+        else:
+            defeats += 1
+            if defeats > max_defeats:
+                break
+            game.respawn()
+    record = game.summary(duration=time.perf_counter() - start, seed=seed)
+    record["kind"] = "campaign"
+    record["defeats"] = defeats
+    yield record
+
+
+def run_campaign(party, seed=None, multiplayer=None, shop=True, max_defeats=100, telemetry=None,
+                 limits=None, broadcast=None, on_round=None):
+    """Play one campaign to the end (or until max_defeats) and return its summary"""
+    for record in iter_campaign(party, seed, multiplayer, shop, max_defeats, telemetry, limits,
+                                broadcast, on_round):
+        pass
+    return record
+
+
+def sweep(parties, seeds, **options):
+    """Lazily yield every tower and campaign record for each party x seed"""
+    for party in parties:
+        for seed in seeds:
+            yield from iter_campaign(party, seed, **options)
+
+
+def main():
+    # A tank against a wall: 1 damage per hit one way, a million HP the other
+    def runaway(limits):
+        game = new_game([("Hero1", "Guardian")], seed=0, limits=limits)
+        hero = game.players[0]
+        hero.stats.adjust("health", 20000)
+        hero.heal(hero.attribute.health.max_value)
+        wall = BlightedMinion()
+        wall.hp = 1_000_000
+        return game, CorruptedTower(1, [wall])
+
+    for label, limits in [("no limits", None),
+                          ("max_rounds=1000", {"max_rounds": 1000}),
+                          ("max_seconds=0.005", {"max_seconds": 0.005}),
+                          ("stall_window=32", {"stall_window": 32}),
+                          ("resolve_early", {"resolve_early": True})]:
+        game, tower = runaway(limits)
+        start = time.perf_counter()
+        won = game.battle_tower(tower)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>18}: {'won' if won else 'lost'} ({game.last_battle_end}) after "
+              f"{game.last_battle_rounds} rounds, {elapsed * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
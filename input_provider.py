@@ -0,0 +1,157 @@
+"""
+Where the games get their keyboard input from.
+
+veil_the_ruin_oop.py and try.py call ask() instead of input(). By default
+that is the console, but a ScriptedInput can replay a command file or be
+driven by a generator, and fast-forward mode tells the terminal helpers
+(pause, slow_print, clear_screen) to skip their delays. Together they let
+whole interactive sessions run end to end for load tests and benchmarks.
+"""
+import contextlib
+import io
+import re
+import sys
+import time
+from abc import ABC, abstractmethod
+
+
+class InputProvider(ABC): #Base Class
+    """Source of player input"""
+    fast_forward = False
+
+    @abstractmethod
+    def ask(self, prompt=""):
+        """The player's answer to prompt"""
+
+
+class ConsoleInput(InputProvider): #Inheritance
+    """The real keyboard"""
+    def ask(self, prompt=""):
+        return input(prompt)
+
+
+class ScriptedInput(InputProvider): #Inheritance
+    """Replays answers from a list, a file or a generator.
+
+    A generator is sent each prompt and yields the answer, so it can react
+    to what the game is asking. When the script runs out EOFError is
+    raised, just like input() at end of file.
+    """
+    def __init__(self, source, fast_forward=True, echo=False):
+        self.fast_forward = fast_forward
+        self.echo = echo
+        self.asked = 0
+        self._interactive = hasattr(source, "send")
+        if self._interactive:
+            next(source)  # run the generator up to its first `prompt = yield`
+            self._source = source
+        else:
+            self._source = iter(source)
+
+    @classmethod
+    def from_file(cls, path, **options):
+        """One answer per line; blank lines are answers too (just Enter)"""
+        with open(path) as f:
+            lines = f.read().splitlines()
+        return cls(lines, **options)
+
+    def ask(self, prompt=""):
+        try:
+            answer = self._source.send(prompt) if self._interactive else next(self._source)
+        except StopIteration:
+            raise EOFError(f"input script ran out after {self.asked} answers") from None
+        self.asked += 1
+        if self.echo:
+            print(f"{prompt}{answer}")
+        return answer
+
+
+_provider = ConsoleInput()
+
+
+def ask(prompt=""):
+    """input() replacement used by the games"""
+    return _provider.ask(prompt)
+
+
+def fast_forward():
+    return _provider.fast_forward
+
+
+def get_input_provider():
+    return _provider
+
+
+def set_input_provider(provider):
+    global _provider
+    previous, _provider = _provider, provider
+    return previous
+
+
+@contextlib.contextmanager
+def use_input_provider(provider):
+    previous = set_input_provider(provider)
+    try:
+        yield provider
+    finally:
+        set_input_provider(previous)
+
+
+# ==================== AUTOPILOT ====================
+def autopilot(hero_class="1", players=2):
+    """Generator script that answers any prompt either game asks"""
+    prompt = yield
+    shopping = False
+    while True:
+        text = prompt.lower()
+        if "mode" in text:
+            answer = "1" if players == 1 else "2"
+        elif "players" in text:
+            answer = str(players)
+        elif "name" in text:
+            answer = "Bench"
+        elif "class" in text:
+            answer = hero_class
+        elif "pick numbers" in text:
+            # Alternate one purchase attempt with leaving, so every shop visit ends
+            shopping = not shopping
+            answer = "1 2, 3 and 4" if shopping else ""
+        elif "select weapon" in text:
+            # "Select weapon #2 (1-5)" -> pick the 2nd weapon
+            answer = re.search(r"#(\d+)", prompt).group(1)
+        else:
+            answer = ""
+        prompt = yield answer
+
+
+def run_session(main, script, quiet=True):
+    """Run a game's main() against a script; returns (seconds, answers given)"""
+    provider = ScriptedInput(script)
+    start = time.perf_counter()
+    with use_input_provider(provider):
+        if quiet:
+            with contextlib.redirect_stdout(io.StringIO()):
+                main()
+        else:
+            main()
+    return time.perf_counter() - start, provider.asked
+
+
+def main():
+    import importlib
+    # Run as a script this file is __main__; the games import `input_provider`
+    from input_provider import run_session, autopilot
+
+    module = importlib.import_module(sys.argv[1] if len(sys.argv) > 1 else "veil_the_ruin_oop")
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    total = answers = 0
+    for i in range(runs):
+        seconds, asked = run_session(module.main, autopilot(hero_class=str(i % 5 + 1)))
+        total += seconds
+        answers += asked
+    print(f"{runs} full sessions of {module.__name__}: {total:.2f}s "
+          f"({total / runs * 1000:.0f} ms/session, {answers} prompts answered)")
+
+
+if __name__ == "__main__":
+    main()
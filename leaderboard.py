@@ -0,0 +1,155 @@
+"""
+SQLite-backed leaderboard and run history.
+
+Every finished campaign (game.summary()) becomes one row in `runs` plus
+one row per hero in `run_players`. Writes are buffered and flushed with
+executemany inside a single transaction, on a WAL-mode database, so bulk
+simulations can insert millions of rows.
+"""
+import json
+import sqlite3
+import sys
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id            INTEGER PRIMARY KEY,
+    finished_at   REAL NOT NULL,
+    duration      REAL NOT NULL,
+    multiplayer   INTEGER NOT NULL,
+    tower_reached INTEGER NOT NULL,
+    victory       INTEGER NOT NULL,
+    seed          INTEGER
+);
+CREATE TABLE IF NOT EXISTS run_players (
+    run_id   INTEGER NOT NULL REFERENCES runs(id),
+    slot     INTEGER NOT NULL,
+    name     TEXT NOT NULL,
+    class    TEXT NOT NULL,
+    gold     INTEGER NOT NULL,
+    essence  INTEGER NOT NULL,
+    equipped TEXT NOT NULL,
+    PRIMARY KEY (run_id, slot)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_players_class_essence ON run_players(class, essence);
+CREATE INDEX IF NOT EXISTS idx_players_essence ON run_players(essence);
+CREATE INDEX IF NOT EXISTS idx_runs_tower ON runs(tower_reached);
+"""
+
+
+class Leaderboard:
+    """Persistent run history with top-N and percentile queries"""
+    def __init__(self, path="aethermoor_runs.db", batch_size=5000):
+        self.path = path
+        self.batch_size = batch_size
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._runs = []  # queued rows, without their id
+        self._players = []  # queued rows, keyed by their run's place in _runs
+
+    def record(self, summary):
+        """Queue one campaign summary. Run ids are assigned when the batch is flushed."""
+        batch_index = len(self._runs)
+        self._runs.append((time.time(), summary["duration"], int(summary["multiplayer"]),
+                           summary["tower_reached"], int(summary["victory"]), summary.get("seed")))
+        for slot, p in enumerate(summary["players"]):
+            self._players.append((batch_index, slot, p["name"], p["class"], p["gold"], p["essence"],
+                                  json.dumps(p["equipped"])))
+        if len(self._runs) >= self.batch_size:
+            self.flush()
+
+    def record_many(self, summaries):
+        for s in summaries:
+            self.record(s)
+
+    def flush(self):
+        """Write the queued runs; returns their ids in the order they were recorded.
+
+        The id block is allocated inside BEGIN IMMEDIATE, which holds the
+        database's write lock, so other writers on the same file can't take
+        the same ids. A failed flush keeps the batch for the next attempt.
+        """
+        if not self._runs:
+            return []
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            base = (db.execute("SELECT MAX(id) FROM runs").fetchone()[0] or 0) + 1
+            db.executemany("INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           [(base + i,) + run for i, run in enumerate(self._runs)])
+            db.executemany("INSERT INTO run_players VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           [(base + row[0],) + row[1:] for row in self._players])
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        ids = list(range(base, base + len(self._runs)))
+        self._runs.clear()
+        self._players.clear()
+        return ids
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    # ---------- queries ----------
+    def top_by_class(self, pclass, n=10):
+        """Best n heroes of a class by essence: (run_id, name, essence, gold, equipped)"""
+        self.flush()
+        rows = self.db.execute(
+            "SELECT run_id, name, essence, gold, equipped FROM run_players "
+            "WHERE class = ? ORDER BY essence DESC LIMIT ?", (pclass, n)).fetchall()
+        return [(r[0], r[1], r[2], r[3], json.loads(r[4])) for r in rows]
+
+    def top_per_class(self, n=10):
+        self.flush()
+        classes = [r[0] for r in self.db.execute("SELECT DISTINCT class FROM run_players")]
+        return {c: self.top_by_class(c, n) for c in classes}
+
+    def percentile_rank(self, run_id, slot=0, within_class=True):
+        """Share (0-100) of heroes with strictly less essence than this run's hero"""
+        self.flush()
+        row = self.db.execute("SELECT class, essence FROM run_players WHERE run_id = ? AND slot = ?",
+                              (run_id, slot)).fetchone()
+        if row is None:
+            return None
+        pclass, essence = row
+        if within_class:
+            below, total = self.db.execute(
+                "SELECT (SELECT COUNT(*) FROM run_players WHERE class = ?1 AND essence < ?2), "
+                "(SELECT COUNT(*) FROM run_players WHERE class = ?1)", (pclass, essence)).fetchone()
+        else:
+            below, total = self.db.execute(
+                "SELECT (SELECT COUNT(*) FROM run_players WHERE essence < ?1), "
+                "(SELECT COUNT(*) FROM run_players)", (essence,)).fetchone()
+        return 100.0 * below / total if total else None
+
+    def history(self, limit=20):
+        self.flush()
+        return self.db.execute(
+            "SELECT id, finished_at, duration, tower_reached, victory FROM runs "
+            "ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+
+# ==================== BULK FILL ====================
+def main():
+    from headless import run_campaign
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    board = Leaderboard()
+    classes = ["Vanguard", "Weaver", "Alchemist", "Rogue", "Guardian"]
+    start = time.perf_counter()
+    for seed in range(count):
+        party = [(f"Hero{seed}", classes[seed % len(classes)]), (f"Ally{seed}", classes[(seed // 5) % 5])]
+        board.record(run_campaign(party, seed=seed))
+    board.flush()
+    print(f"Recorded {count} campaigns in {time.perf_counter() - start:.2f}s")
+    for pclass, rows in board.top_per_class(3).items():
+        print(pclass, [(name, essence) for _, name, essence, _, _ in rows])
+    board.close()
+
+
+if __name__ == "__main__":
+    main()
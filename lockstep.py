@@ -0,0 +1,431 @@
+"""
+Lockstep multiplayer: every client runs the same seeded AethermoorGame and
+only the players' decisions cross the network.
+
+The campaign advances in turns. A turn is one decision point - before the
+first tower, then after every battle - where each player sends an input
+frame: shop picks (indices into the offers the shop just drew for them),
+the weapons to equip, and a targeting strategy for the next battle (the
+one from the turn's leader, rotating through the party, is used). The host
+relays the frames as one bundle; every client applies the same bundle to
+the same state with the same dice, so no game state is ever sent. A frame
+is a few dozen bytes per player whether the tower holds ten enemies or ten
+thousand, and the battle rounds themselves cost nothing on the wire.
+
+Every hash_interval turns the frames also carry a hash of the client's
+state. If they disagree the host asks a client holding the majority hash
+for a snapshot and sends it to the others before the bundle (a resync).
+A snapshot is plain JSON - numbers, item ids and strategy names - that the
+receiver rebuilds a fresh game from, so a peer can only ever send bad
+values, never code. Inputs are validated as they are applied, so a frame
+decided on a stale state still applies the same way everywhere.
+
+    python lockstep.py demo [players] [desync_turn]      # host plus local clients
+    python lockstep.py host [port] [players] [seed]
+    python lockstep.py client HOST:PORT player [--desync-at N]
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from headless import new_game
+from veil_the_ruin_oop import (ITEMS, TARGETING_STRATEGIES, Checkpoint, get_targeting_strategy,
+                               shop_weapon_choices, get_equip_limit, equip_weapons,
+                               player_state, restore_player, restore_tower)
+from wire import encode, recv, recv_blocking, recv_frame, send_blocking
+
+
+# ==================== PLAIN STATE ====================
+def _item_id(item):
+    return item.item_id if item is not None else None
+
+
+def _item(item_id):
+    return ITEMS.get(item_id) if item_id is not None else None
+
+
+def _plain_player(state):
+    """A player_state tuple as JSON-ready lists, items by id"""
+    health, stats, speed, is_alive, gold, essence, checkpoint, inventory = state
+    owned, equipped, armor, accessory = inventory
+    return [health, list(stats), speed, is_alive, gold, essence, checkpoint,
+            [[list(pair) for pair in owned], [w.item_id for w in equipped],
+             _item_id(armor), _item_id(accessory)]]
+
+
+def _player_from_plain(plain):
+    health, stats, speed, is_alive, gold, essence, checkpoint, inventory = plain
+    owned, equipped, armor, accessory = inventory
+    return (int(health), tuple(int(v) for v in stats), int(speed), bool(is_alive), int(gold),
+            int(essence), int(checkpoint),
+            (tuple((int(i), int(n)) for i, n in owned), tuple(ITEMS.get(i) for i in equipped),
+             _item(armor), _item(accessory)))
+
+
+def _strategy_name(strategy):
+    return next(name for name, cls in TARGETING_STRATEGIES.items() if type(strategy) is cls)
+
+
+# ==================== SIMULATION ====================
+class LockstepSession:
+    """One client's copy of the campaign, advanced only by input frames"""
+    def __init__(self, party, seed, max_defeats=20):
+        self.party = [tuple(member) for member in party]
+        self.seed = seed
+        self.game = new_game(self.party, seed)
+        self.max_defeats = max_defeats
+        self.turn = 0
+        self.offers = [[] for _ in self.game.players]  # item ids each player may buy this turn
+        self.tower_gold = 0  # gold of the tower just won, 0 after a defeat
+        self.defeats = 0
+        self.rounds = 0
+
+    @property
+    def finished(self):
+        game = self.game
+        return game.current_tower >= len(game.towers) or self.defeats > self.max_defeats
+
+    def decide(self, index, rng=random):
+        """Default policy for player index: strongest affordable offers, the
+        hardest hitters equipped, a random targeting strategy"""
+        player = self.game.players[index]
+        gold = player.gold
+        buy, bought = [], []
+        offers = sorted(enumerate(self.offers[index]), key=lambda o: -ITEMS.get(o[1]).damage)
+        for i, item_id in offers:
+            weapon = ITEMS.get(item_id)
+            if weapon.price <= gold and not player.inventory.owns(weapon) and weapon not in bought:
+                gold -= weapon.price
+                buy.append(i)
+                bought.append(weapon)
+        equip = []
+        if self.tower_gold:
+            weapons = sorted(player.inventory.weapons() + bought, key=lambda w: -w.damage)
+            equip = [w.item_id for w in weapons[:get_equip_limit(self.tower_gold)]]
+        return {"buy": buy, "equip": equip, "target": rng.choice(sorted(TARGETING_STRATEGIES))}
+
+    def apply(self, inputs):
+        """Apply one frame per player, in party order, then play the next battle"""
+        for player, frame, offers in zip(self.game.players, inputs, self.offers):
+            for i in frame.get("buy", ()):
+                if isinstance(i, int) and 0 <= i < len(offers):
+                    weapon = ITEMS.get(offers[i])
+                    if weapon.price <= player.gold and not player.inventory.owns(weapon):
+                        player.buy_weapon(weapon, weapon.price)
+            if self.tower_gold:
+                weapons = []
+                for item_id in frame.get("equip", ()):
+                    if isinstance(item_id, int) and 0 <= item_id < len(ITEMS):
+                        weapon = ITEMS.get(item_id)
+                        if weapon in player.inventory.weapons() and weapon not in weapons:
+                            weapons.append(weapon)
+                if weapons:
+                    equip_weapons(player, weapons[:get_equip_limit(self.tower_gold)])
+        leader = inputs[self.turn % len(inputs)] if inputs else {}
+        if leader.get("target") in TARGETING_STRATEGIES:
+            self.game.player_targeting = get_targeting_strategy(leader["target"])
+        self.turn += 1
+        self.advance()
+
+    def advance(self):
+        """Play the next battle and open the shop for the following turn"""
+        game = self.game
+        self.offers = [[] for _ in game.players]
+        self.tower_gold = 0
+        while game.current_tower < len(game.towers) and game.towers[game.current_tower].cleared:
+            game.current_tower += 1
+        if self.finished:
+            return
+        tower = game.towers[game.current_tower]
+        won = game.battle_tower(tower)
+        self.rounds += game.last_battle_rounds
+        if won:
+            self.tower_gold = tower.calculate_tower_gold()
+            game.current_tower += 1
+            if game.current_tower < len(game.towers):
+                for i, player in enumerate(game.players):
+                    if player.is_alive:
+                        self.offers[i] = [w.item_id for w in shop_weapon_choices(player, game.rng)]
+        else:
+            self.defeats += 1
+            game.respawn()
+
+    def snapshot(self):
+        """Everything the next turn depends on, as plain JSON-ready data"""
+        game = self.game
+        checkpoint = game.checkpoints[-1] if game.checkpoints else None
+        version, internal, gauss = game.rng.getstate()
+        return {
+            "turn": self.turn, "offers": self.offers, "tower_gold": self.tower_gold,
+            "defeats": self.defeats, "current_tower": game.current_tower,
+            "targeting": [_strategy_name(game.player_targeting), _strategy_name(game.enemy_targeting)],
+            "players": [_plain_player(player_state(p)) for p in game.players],
+            "towers": [[t.cleared, t.corruption, [e.hp for e in t.enemies]] for t in game.towers],
+            "checkpoint": checkpoint and [
+                checkpoint.tower_index, [_plain_player(s) for s in checkpoint.players],
+                [[cleared, corruption, list(hps)] for cleared, corruption, hps in checkpoint.towers]],
+            "rng": [version, list(internal), gauss],
+        }
+
+    def state_hash(self):
+        return hashlib.blake2b(json.dumps(self.snapshot(), separators=(",", ":")).encode(),
+                               digest_size=8).hexdigest()
+
+    def load(self, state):
+        """Replace the game with a fresh one rebuilt from snapshot() data"""
+        game = new_game(self.party, self.seed)
+        for p, plain in zip(game.players, state["players"]):
+            restore_player(p, _player_from_plain(plain))
+        for tower, (cleared, corruption, hps) in zip(game.towers, state["towers"]):
+            restore_tower(tower, (bool(cleared), str(corruption), tuple(int(hp) for hp in hps)))
+        game._tower_applied = [None] * len(game.towers)
+        if state["checkpoint"]:
+            index, players, towers = state["checkpoint"]
+            game.checkpoints = [Checkpoint(
+                int(index), tuple(_player_from_plain(s) for s in players),
+                tuple((bool(c), str(k), tuple(int(hp) for hp in hps)) for c, k, hps in towers))]
+        game.current_tower = int(state["current_tower"])
+        player_targeting, enemy_targeting = state["targeting"]
+        game.player_targeting = get_targeting_strategy(player_targeting)
+        game.enemy_targeting = get_targeting_strategy(enemy_targeting)
+        version, internal, gauss = state["rng"]
+        game.rng.setstate((int(version), tuple(int(v) for v in internal),
+                          None if gauss is None else float(gauss)))
+        self.game = game
+        self.turn = int(state["turn"])
+        self.offers = [[int(i) for i in offers] for offers in state["offers"]]
+        self.tower_gold = int(state["tower_gold"])
+        self.defeats = int(state["defeats"])
+
+
+# ==================== HOST ====================
+class LockstepHost:
+    """Relay input frames between the party's clients and repair desyncs"""
+    def __init__(self, party, seed, host="127.0.0.1", port=0, hash_interval=5, timeout=60.0):
+        self.party = [list(member) for member in party]
+        self.seed = seed
+        self.host = host
+        self.port = port
+        self.hash_interval = hash_interval
+        self.timeout = timeout
+        self.turns = 0
+        self.resyncs = []  # (turn, players resynced)
+        self.input_bytes = 0  # frames in plus bundles out, per recipient
+        self.snapshot_bytes = 0  # resync traffic, likewise
+        self.finals = {}  # player -> the client's "done" message
+        self.aborted = False
+        self._writers = {}
+        self._pending = {}  # turn -> {player: input message}
+        self._snapshot = None
+        self._ready = None
+        self._finished = None
+
+    async def serve(self, on_listening=None):
+        """Run one campaign: until every client is done or one drops out"""
+        self._ready = asyncio.Event()
+        self._finished = asyncio.Event()
+        server = await asyncio.start_server(self._serve_client, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        if on_listening is not None:
+            on_listening(self)
+        async with server:
+            await self._finished.wait()
+        for writer in self._writers.values():
+            writer.close()
+        return self.finals
+
+    def run(self, on_listening=None):
+        return asyncio.run(self.serve(on_listening))
+
+    @property
+    def in_sync(self):
+        return len({m["hash"] for m in self.finals.values()}) == 1
+
+    async def _send(self, players, message):
+        data = encode(message)  # encoded once, whatever the number of recipients
+        for player in players:
+            writer = self._writers[player]
+            writer.write(data)
+        for player in players:
+            await self._writers[player].drain()
+        return len(data) * len(players)
+
+    async def _serve_client(self, reader, writer):
+        player = None
+        try:
+            player = int((await recv(reader))["player"])
+            if player in self._writers or not 0 <= player < len(self.party):
+                raise ValueError(f"bad or duplicate player {player}")
+            self._writers[player] = writer
+            if len(self._writers) == len(self.party):
+                await self._send(range(len(self.party)), {
+                    "op": "start", "party": self.party, "seed": self.seed,
+                    "hash_interval": self.hash_interval})
+                self._ready.set()
+            while True:
+                message, size = await recv_frame(reader)
+                op = message.get("op")
+                if op == "input":
+                    self.input_bytes += size
+                    turn = message["turn"]
+                    inputs = self._pending.setdefault(turn, {})
+                    inputs[player] = message
+                    if len(inputs) == len(self.party):
+                        # A task of its own: a resync waits on a snapshot that
+                        # this very handler may have to read
+                        asyncio.create_task(self._close_turn(turn))
+                elif op == "snapshot" and self._snapshot is not None:
+                    self.snapshot_bytes += size
+                    self._snapshot.set_result(message["data"])
+                elif op == "done":
+                    self.finals[player] = message
+                    if len(self.finals) == len(self.party):
+                        self._finished.set()
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, KeyError):
+            if len(self.finals) < len(self.party):
+                self.aborted = True  # lockstep can't go on without a player
+                self._finished.set()
+
+    async def _close_turn(self, turn):
+        inputs = self._pending.pop(turn)
+        hashes = {p: m["hash"] for p, m in inputs.items() if m.get("hash")}
+        if len(set(hashes.values())) > 1:
+            # Majority wins, ties go to the lowest player number
+            votes = list(hashes.values())
+            good = max((hashes[p] for p in sorted(hashes)), key=votes.count)
+            donor = min(p for p in hashes if hashes[p] == good)
+            stale = sorted(p for p in hashes if hashes[p] != good)
+            self._snapshot = asyncio.get_running_loop().create_future()
+            await self._send([donor], {"op": "snapshot_request", "turn": turn})
+            try:
+                data = await asyncio.wait_for(self._snapshot, self.timeout)
+            except asyncio.TimeoutError:
+                self.aborted = True
+                self._finished.set()
+                return
+            finally:
+                self._snapshot = None
+            self.snapshot_bytes += await self._send(stale, {"op": "resync", "turn": turn, "data": data})
+            self.resyncs.append((turn, stale))
+        self.input_bytes += await self._send(range(len(self.party)), {
+            "op": "frame", "turn": turn, "inputs": [inputs[p]["input"] for p in range(len(self.party))]})
+        self.turns += 1
+
+
+# ==================== CLIENT ====================
+def run_client(host, port, player, desync_at=None, retry_connect=5.0):
+    """Play one player's side of a lockstep campaign. desync_at=n corrupts
+    this client's gold at turn n (for exercising resyncs)."""
+    deadline = time.monotonic() + retry_connect
+    while True:
+        try:
+            sock = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+    resynced = 0
+    with sock:
+        send_blocking(sock, {"op": "hello", "player": player})
+        start = recv_blocking(sock)
+        session = LockstepSession(start["party"], start["seed"])
+        interval = start["hash_interval"]
+        rng = random.Random(player)  # this player's own choices, never shared
+        while not session.finished:
+            if session.turn == desync_at:
+                session.game.players[player].gold += 100
+            message = {"op": "input", "turn": session.turn, "input": session.decide(player, rng)}
+            if session.turn % interval == 0:
+                message["hash"] = session.state_hash()
+            send_blocking(sock, message)
+            while True:
+                reply = recv_blocking(sock)
+                if reply["op"] == "snapshot_request":
+                    send_blocking(sock, {"op": "snapshot", "turn": reply["turn"],
+                                          "data": session.snapshot()})
+                elif reply["op"] == "resync":
+                    session.load(reply["data"])
+                    resynced += 1
+                elif reply["op"] == "frame":
+                    session.apply(reply["inputs"])
+                    break
+        summary = session.game.summary(seed=start["seed"])
+        send_blocking(sock, {"op": "done", "turn": session.turn, "hash": session.state_hash(),
+                              "rounds": session.rounds, "resynced": resynced,
+                              "tower_reached": summary["tower_reached"],
+                              "victory": summary["victory"]})
+    return session
+
+
+# ==================== CLI ====================
+def _spawn_client(host, port, player, *extra):
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "client",
+                             f"{host}:{port}", str(player), *extra])
+
+
+def demo(players=3, desync_turn=7, seed=42):
+    """Host plus one local client process per player; the last one desyncs on purpose"""
+    classes = ["Vanguard", "Weaver", "Alchemist", "Rogue", "Guardian"]
+    party = [(f"Hero{i + 1}", classes[i % len(classes)]) for i in range(players)]
+    host = LockstepHost(party, seed)
+    procs = []
+
+    def launch(h):
+        for i in range(players):
+            extra = ("--desync-at", str(desync_turn)) if i == players - 1 and desync_turn >= 0 else ()
+            procs.append(_spawn_client(h.host, h.port, i, *extra))
+
+    start = time.perf_counter()
+    finals = host.run(launch)
+    elapsed = time.perf_counter() - start
+    for proc in procs:
+        proc.wait()
+    if host.aborted or not finals:
+        print("Campaign aborted: a client dropped out")
+        return
+    final = finals[0]
+    frames = host.input_bytes
+    print(f"{players} players, seed {seed}: tower {final['tower_reached']} reached, "
+          f"{'victory' if final['victory'] else 'no victory'} in {host.turns} turns, "
+          f"{final['rounds']} battle rounds ({elapsed:.2f}s)")
+    print(f"Final state hashes {'all match' if host.in_sync else 'DIFFER'}: "
+          f"{sorted({m['hash'] for m in finals.values()})}")
+    print(f"Input traffic {frames:,} bytes: {frames / max(host.turns, 1):.0f} per turn, "
+          f"{frames / max(final['rounds'], 1):.1f} per battle round")
+    for turn, stale in host.resyncs:
+        print(f"Desync at turn {turn}: player(s) {stale} resynced from a snapshot")
+    if host.resyncs:
+        print(f"Resync traffic {host.snapshot_bytes:,} bytes")
+
+
+def main():
+    mode = sys.argv[1] if len(sys.argv) > 1 else "demo"
+    if mode == "client":
+        host, port = sys.argv[2].rsplit(":", 1)
+        desync_at = int(sys.argv[5]) if "--desync-at" in sys.argv[4:5] else None
+        run_client(host, int(port), int(sys.argv[3]), desync_at=desync_at)
+    elif mode == "host":
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 9400
+        players = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+        seed = int(sys.argv[4]) if len(sys.argv) > 4 else 42
+        classes = ["Vanguard", "Weaver", "Alchemist", "Rogue", "Guardian"]
+        party = [(f"Hero{i + 1}", classes[i % len(classes)]) for i in range(players)]
+        host = LockstepHost(party, seed, host="0.0.0.0", port=port)
+        host.run(lambda h: print(f"Waiting for {players} players on port {h.port}", flush=True))
+        print("aborted" if host.aborted else
+              f"{host.turns} turns, {len(host.resyncs)} resync(s), in sync: {host.in_sync}")
+    else:
+        demo(int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+             int(sys.argv[3]) if len(sys.argv) > 3 else 7)
+
+
+if __name__ == "__main__":
+    main()
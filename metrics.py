@@ -0,0 +1,171 @@
+"""
+Live metrics for a long-running game host, served on localhost.
+
+Instruments are plain objects that the game thread updates with ordinary
+attribute arithmetic: no locks, no queues. The HTTP server runs in its own
+thread and copies the current values when it is scraped, so a scrape can
+never stall the game loop, and it only reads - concurrent scrapes from
+the server's handler threads can't disturb each other or the game. At
+worst one sees an instrument mid-update, which is a one-observation skew.
+
+    metrics = GameMetrics()
+    server = MetricsServer(metrics, port=9108)   # GET http://127.0.0.1:9108/metrics
+    game.metrics = metrics
+"""
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def expose(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter",
+                f"{self.name} {self.value}"]
+
+
+class RateCounter(Counter):
+    """A counter that also keeps per-second totals for its recent rate.
+
+    inc() files each amount under the current second in a ring of
+    one-second buckets; rate() only reads the ring.
+    """
+    def __init__(self, name, help_text, window=10.0):
+        super().__init__(name, help_text)
+        self.window = max(1, int(window))
+        self.seconds = [None] * (self.window + 1)  # the second each bucket holds
+        self.totals = [0] * (self.window + 1)
+        self.started = int(time.monotonic())
+
+    def inc(self, amount=1):
+        self.value += amount
+        second = int(time.monotonic())
+        i = second % len(self.seconds)
+        if self.seconds[i] != second:
+            self.seconds[i] = second
+            self.totals[i] = 0
+        self.totals[i] += amount
+
+    def rate(self):
+        """Per second over the last `window` whole seconds (fewer just after start)"""
+        now = int(time.monotonic())
+        span = min(self.window, now - self.started)
+        if span <= 0:
+            return 0.0
+        total = sum(n for second, n in zip(list(self.seconds), list(self.totals))
+                    if second is not None and 0 < now - second <= span)
+        return round(total / span, 3)
+
+
+class Gauge:
+    """A value read at scrape time from a callable"""
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def expose(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name} {self.read()}"]
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def expose(self):
+        counts = list(self.counts)  # snapshot before formatting
+        total_sum = self.sum
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        running = 0
+        for bound, n in zip(self.bounds + ["+Inf"], counts):
+            running += n
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {running}')
+        lines.append(f"{self.name}_sum {total_sum}")
+        lines.append(f"{self.name}_count {running}")
+        return lines
+
+
+def _live_characters():
+    from veil_the_ruin_oop import CorruptedTower, Player
+    return len(Player.live) + CorruptedTower.live_enemies
+
+
+class GameMetrics:
+    """The instruments a game host reports"""
+    def __init__(self, active_games=lambda: 0, window=10.0):
+        self.towers_cleared = RateCounter("aethermoor_towers_cleared_total", "Towers purified", window)
+        self.battles = Counter("aethermoor_battles_total", "Tower battles fought")
+        self.round_seconds = Histogram(
+            "aethermoor_battle_round_seconds", "Wall time of one battle_tower round",
+            [0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05])
+        self.shop_wait_seconds = Histogram(
+            "aethermoor_shop_wait_seconds", "Time a shop visit waits for the player",
+            [0.001, 0.01, 0.1, 0.5, 1, 5, 15, 60, 300])
+        self.instruments = [
+            Gauge("aethermoor_active_games", "Games currently running", active_games),
+            self.towers_cleared,
+            Gauge("aethermoor_towers_cleared_per_second",
+                  f"Towers purified per second over the last {self.towers_cleared.window}s",
+                  self.towers_cleared.rate),
+            self.battles,
+            self.round_seconds,
+            self.shop_wait_seconds,
+            Gauge("aethermoor_live_characters", "Heroes plus the enemies of live towers in this process",
+                  _live_characters),
+        ]
+
+    def render(self):
+        lines = []
+        for instrument in self.instruments:
+            lines.extend(instrument.expose())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """stdlib HTTP server on localhost, answering GET /metrics from a daemon thread"""
+    def __init__(self, metrics, port=9108, host="127.0.0.1"):
+        self.metrics = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?")[0] != "/metrics":
+                    handler.send_error(404)
+                    return
+                body = metrics.render().encode()
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass  # no per-scrape noise on the game's console
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
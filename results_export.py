@@ -0,0 +1,165 @@
+"""
+Streaming, column-oriented export of simulation results.
+
+Records from headless.sweep() are appended row by row, but buffered per
+column in fixed-size chunks (stdlib `array`), so memory stays bounded by
+chunk_rows no matter how long the sweep runs. Two formats:
+
+* CSV - plain text, one chunk written at a time.
+* .acol - compact binary columns: a JSON header, then chunks of
+  [uint32 row count][column 0 bytes][column 1 bytes]... Reading back is a
+  np.frombuffer per column per chunk - no per-row parsing.
+"""
+import csv
+import json
+import struct
+import sys
+import time
+from array import array
+
+MAGIC = b"ACOL1\n"
+
+TOWER_COLUMNS = {
+    "seed": "q", "tower": "q", "won": "q", "rounds": "q", "alive": "q",
+    "party_hp": "q", "party_gold": "q", "party_essence": "q",
+}
+CAMPAIGN_COLUMNS = {
+    "seed": "q", "tower_reached": "q", "victory": "q", "defeats": "q", "duration": "d",
+    "players": "q", "gold": "q", "essence": "q",
+}
+_NUMPY_DTYPES = {"q": "<i8", "d": "<f8"}
+
+
+def flatten_campaign(record):
+    """Collapse a campaign summary to the numeric CAMPAIGN_COLUMNS"""
+    players = record["players"]
+    return {
+        "seed": record["seed"] if record["seed"] is not None else -1,
+        "tower_reached": record["tower_reached"],
+        "victory": record["victory"],
+        "defeats": record["defeats"],
+        "duration": record["duration"],
+        "players": len(players),
+        "gold": sum(p["gold"] for p in players),
+        "essence": sum(p["essence"] for p in players),
+    }
+
+
+class ColumnWriter:
+    """Append dict rows; every chunk_rows rows the column buffers are written out"""
+    def __init__(self, path, columns, chunk_rows=65536, fmt=None):
+        self.path = path
+        self.columns = dict(columns)
+        self.chunk_rows = chunk_rows
+        self.fmt = fmt or ("csv" if str(path).endswith(".csv") else "acol")
+        self.rows_written = 0
+        self._buffers = {name: array(code) for name, code in self.columns.items()}
+        self._pending = 0
+        if self.fmt == "csv":
+            self._file = open(path, "w", newline="")
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.columns)
+        else:
+            self._file = open(path, "wb")
+            header = json.dumps({"columns": list(self.columns.items())}).encode()
+            self._file.write(MAGIC + struct.pack("<I", len(header)) + header)
+
+    def append(self, row):
+        for name, buf in self._buffers.items():
+            buf.append(row[name])
+        self._pending += 1
+        if self._pending >= self.chunk_rows:
+            self.flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def flush(self):
+        if not self._pending:
+            return
+        buffers = list(self._buffers.values())
+        if self.fmt == "csv":
+            self._csv.writerows(zip(*buffers))
+        else:
+            self._file.write(struct.pack("<I", self._pending))
+            for buf in buffers:
+                if sys.byteorder != "little":
+                    buf.byteswap()
+                buf.tofile(self._file)
+        self.rows_written += self._pending
+        self._pending = 0
+        self._buffers = {name: array(code) for name, code in self.columns.items()}
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_sweep(records, tower_path, campaign_path, chunk_rows=65536):
+    """Route a stream of headless records into a tower file and a campaign file"""
+    with ColumnWriter(tower_path, TOWER_COLUMNS, chunk_rows) as towers, \
+            ColumnWriter(campaign_path, CAMPAIGN_COLUMNS, chunk_rows) as campaigns:
+        for record in records:
+            if record["kind"] == "tower":
+                towers.append(record)
+            else:
+                campaigns.append(flatten_campaign(record))
+    return towers.rows_written, campaigns.rows_written
+
+
+# ==================== READING BACK ====================
+def read_columns(path):
+    """Load a .acol file as {column: numpy array} (the file is memory-mapped)"""
+    import numpy as np
+
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    if bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not an .acol file")
+    offset = len(MAGIC)
+    (size,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    columns = json.loads(bytes(data[offset:offset + size]))["columns"]
+    offset += size
+
+    parts = {name: [] for name, _ in columns}
+    while offset < len(data):
+        (rows,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        for name, code in columns:
+            dtype = np.dtype(_NUMPY_DTYPES[code])
+            parts[name].append(np.frombuffer(data, dtype, rows, offset))
+            offset += rows * dtype.itemsize
+    return {name: np.concatenate(parts[name]) if parts[name] else np.empty(0, _NUMPY_DTYPES[code])
+            for name, code in columns}
+
+
+def read_csv_columns(path):
+    """Load an exported CSV as {column: numpy array} (types inferred by NumPy)"""
+    import numpy as np
+
+    table = np.genfromtxt(path, delimiter=",", names=True, dtype=None, encoding=None)
+    return {name: np.atleast_1d(table[name]) for name in table.dtype.names}
+
+
+# ==================== CLI ====================
+def main():
+    from headless import sweep
+
+    campaigns = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    fmt = sys.argv[2] if len(sys.argv) > 2 else "acol"
+    parties = [[("Hero", "Vanguard"), ("Ally", "Guardian")]]
+    start = time.perf_counter()
+    towers, runs = write_sweep(sweep(parties, range(campaigns)),
+                               f"towers.{fmt}", f"campaigns.{fmt}")
+    print(f"Wrote {towers} tower rows and {runs} campaign rows in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Host many independent AethermoorGame sessions on one asyncio loop.
+
+Each session owns its own game and random.Random, so sessions never share
+dice or state. Battles run as AethermoorGame.battle_steps generators in
+short time slices, so no session holds the loop for more than slice_ms.
+Clients talk to a session through two queues: commands go in, events
+come out. Sessions idle at a prompt are evicted to pickled snapshots and
+restored when the next command arrives.
+"""
+import asyncio
+import pickle
+import random
+import sys
+import time
+
+from metrics import GameMetrics, MetricsServer
+
+from veil_the_ruin_oop import (AethermoorGame, HERO_CLASSES, Vanguard, shop_weapon_choices,
+                               get_equip_limit, equip_weapons)
+
+
+class HostFullError(Exception):
+    """Raised when admission control turns a new session away"""
+
+
+class GameSession:
+    """One campaign, driven as a small state machine: battle -> shop -> equip -> battle"""
+    def __init__(self, host, session_id, party, multiplayer, seed):
+        self.host = host
+        self.id = session_id
+        self.game = AethermoorGame(multiplayer=multiplayer, rng=random.Random(seed))
+        for name, pclass in party:
+            self.game.add_player(HERO_CLASSES.get(pclass, Vanguard)(name))
+        self.phase = "battle"
+        self.pending = []  # player indices still to shop / equip this break
+        self.offers = []
+        self.tower_gold = 0
+        self.inbox = asyncio.Queue()
+        self.events = asyncio.Queue()
+        self.waiting = False
+        self.last_active = time.monotonic()
+        self.snapshot = None
+        self.resumed = False
+        self.task = None
+
+    # ---------- lifecycle ----------
+    @property
+    def evicted(self):
+        return self.snapshot is not None
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self._drive())
+
+    def evict(self):
+        """Park an idle session as bytes; only legal while it waits at a prompt"""
+        self.task.cancel()
+        self.task = None
+        self.snapshot = pickle.dumps({
+            "game": self.game,
+            "phase": self.phase,
+            "pending": self.pending,
+            "offers": self.offers,
+            "tower_gold": self.tower_gold,
+        })
+        self.game = None
+        self.offers = []
+        self.waiting = False
+        self.host.live -= 1
+
+    def restore(self):
+        state = pickle.loads(self.snapshot)
+        self.snapshot = None
+        self.host.live += 1
+        self.game = state["game"]
+        self.game.metrics = self.host.metrics
+        self.phase = state["phase"]
+        self.pending = state["pending"]
+        self.offers = state["offers"]
+        self.tower_gold = state["tower_gold"]
+        self.last_active = time.monotonic()
+        self.resumed = True
+        self.start()
+
+    # ---------- client side ----------
+    async def send(self, command):
+        """Answer the current prompt: a list of numbers, or [] / None to skip"""
+        self.last_active = time.monotonic()
+        if self.evicted:
+            self.host.admit(self)
+            self.restore()
+        await self.inbox.put(command)
+
+    async def next_event(self):
+        return await self.events.get()
+
+    # ---------- driver ----------
+    def _emit(self, event, **data):
+        data["event"] = event
+        self.events.put_nowait(data)
+
+    async def _ask(self, event, **data):
+        # The client already saw this prompt before the session was evicted
+        if self.resumed:
+            self.resumed = False
+        else:
+            self._emit(event, **data)
+        self.waiting = True
+        self.last_active = time.monotonic()
+        try:
+            return await self.inbox.get()
+        finally:
+            self.waiting = False
+
+    async def _drive(self):
+        try:
+            while self.phase != "finished":
+                if self.phase == "battle":
+                    await self._battle()
+                elif self.phase == "shop":
+                    await self._shop()
+                elif self.phase == "equip":
+                    await self._equip()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.phase = "finished"
+            self._emit("error", message=repr(exc))
+        if self.phase == "finished":
+            self.host.close(self)
+
+    async def _battle(self):
+        game = self.game
+        while game.current_tower < len(game.towers) and game.towers[game.current_tower].cleared:
+            game.current_tower += 1
+        if game.current_tower >= len(game.towers):
+            self._finish()
+            return
+        tower = game.towers[game.current_tower]
+        self._emit("tower", number=tower.number, enemies=len(tower.enemies))
+
+        won = await self.host.run_sliced(game.battle_steps(tower))
+        if not won:
+            self._emit("defeated", number=tower.number)
+            game.respawn()
+            return
+
+        self.tower_gold = tower.calculate_tower_gold()
+        game.current_tower += 1
+        self._emit("purified", number=tower.number, gold=self.tower_gold,
+                   players={p.name: p.gold for p in game.players})
+        if game.current_tower >= len(game.towers):
+            self._finish()
+            return
+        self.pending = [i for i, p in enumerate(game.players) if p.is_alive]
+        self.offers = []
+        self.phase = "shop" if self.pending else "battle"
+
+    async def _shop(self):
+        player = self.game.players[self.pending[0]]
+        if not self.offers:
+            self.offers = shop_weapon_choices(player, self.game.rng)
+        offers = [(w.name, w.damage, w.price, player.inventory.owns(w)) for w in self.offers]
+        asked = time.perf_counter()
+        picks = await self._ask("shop", player=player.name, gold=player.gold, offers=offers)
+        if self.host.metrics is not None:
+            self.host.metrics.shop_wait_seconds.observe(time.perf_counter() - asked)
+        bought = []
+        for n in sorted(set(picks or [])):
+            if 1 <= n <= len(self.offers):
+                weapon = self.offers[n - 1]
+                if player.gold >= weapon.price and not player.inventory.owns(weapon):
+                    player.buy_weapon(weapon, weapon.price)
+                    bought.append(weapon.name)
+        self._emit("bought", player=player.name, weapons=bought, gold=player.gold)
+
+        # One visit per player per break; single player then equips
+        self.pending.pop(0)
+        self.offers = []
+        if not self.pending:
+            if self.game.multiplayer:
+                self.phase = "battle"
+            else:
+                self.pending = [i for i, p in enumerate(self.game.players) if p.is_alive]
+                self.phase = "equip"
+
+    async def _equip(self):
+        player = self.game.players[self.pending[0]]
+        owned = player.inventory.weapons()
+        limit = get_equip_limit(self.tower_gold)
+        picks = await self._ask("equip", player=player.name, limit=limit,
+                                weapons=[(w.name, w.damage) for w in owned])
+        chosen = []
+        for n in picks or []:
+            if 1 <= n <= len(owned) and owned[n - 1] not in chosen and len(chosen) < limit:
+                chosen.append(owned[n - 1])
+        if chosen:
+            equip_weapons(player, chosen)
+        self._emit("equipped", player=player.name, weapons=[w.name for w in chosen],
+                   attack=player.attribute.attack.value)
+        self.pending.pop(0)
+        if not self.pending:
+            self.phase = "battle"
+
+    def _finish(self):
+        self.phase = "finished"
+        ranking = sorted(self.game.players, key=lambda p: p.essence_collected, reverse=True)
+        self._emit("victory", leaderboard=[(p.name, p.player_class, p.essence_collected, p.gold)
+                                           for p in ranking])
+
+
+class SessionHost:
+    """Runs sessions on the current event loop with admission control and idle eviction.
+
+    With metrics_port, a GameMetrics endpoint is served on localhost:metrics_port.
+    """
+    def __init__(self, max_sessions=500, slice_ms=2.0, idle_seconds=300.0, reap_every=1.0,
+                 metrics_port=None):
+        self.max_sessions = max_sessions
+        self.slice_seconds = slice_ms / 1000.0
+        self.idle_seconds = idle_seconds
+        self.reap_every = reap_every
+        self.sessions = {}
+        self.live = 0  # sessions not evicted - a plain int so metric scrapes can read it
+        self._next_id = 1
+        self._reaper = None
+        self.metrics = self.metrics_server = None
+        if metrics_port is not None:
+            self.metrics = GameMetrics(active_games=lambda: self.live)
+            self.metrics_server = MetricsServer(self.metrics, metrics_port)
+
+    def admit(self, session=None):
+        """Make room for one more live session: evict the stalest idle one or refuse"""
+        if self.live < self.max_sessions:
+            return
+        idle = [s for s in self.sessions.values() if s.waiting and s is not session]
+        if not idle:
+            raise HostFullError(f"{self.max_sessions} sessions already running")
+        min(idle, key=lambda s: s.last_active).evict()
+
+    def open_session(self, party, multiplayer=None, seed=None):
+        """party: list of (name, class name). Returns a started GameSession."""
+        self.admit()
+        if self._reaper is None:
+            self._reaper = asyncio.get_running_loop().create_task(self._reap())
+        multiplayer = len(party) > 1 if multiplayer is None else multiplayer
+        session = GameSession(self, self._next_id, party, multiplayer, seed)
+        session.game.metrics = self.metrics
+        self._next_id += 1
+        self.sessions[session.id] = session
+        self.live += 1
+        session.start()
+        return session
+
+    def close(self, session):
+        if self.sessions.pop(session.id, None) is not None and not session.evicted:
+            self.live -= 1
+
+    async def run_sliced(self, steps):
+        """Run a battle generator, yielding to the loop after every slice"""
+        clock = time.perf_counter
+        while True:
+            deadline = clock() + self.slice_seconds
+            try:
+                while clock() < deadline:
+                    next(steps)
+            except StopIteration as done:
+                return done.value
+            await asyncio.sleep(0)
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(self.reap_every)
+            now = time.monotonic()
+            for s in list(self.sessions.values()):
+                if s.waiting and now - s.last_active > self.idle_seconds:
+                    s.evict()
+
+    async def shutdown(self):
+        if self._reaper:
+            self._reaper.cancel()
+        for s in list(self.sessions.values()):
+            if s.task:
+                s.task.cancel()
+        self.sessions.clear()
+        self.live = 0
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+
+
+# ==================== LOCAL CLIENT ====================
+class LocalClient:
+    """In-process client - answers every prompt with a simple policy"""
+    def __init__(self, session):
+        self.session = session
+
+    async def play(self):
+        """Buy the cheapest affordable offer, equip the strongest weapons, return the last event"""
+        while True:
+            event = await self.session.next_event()
+            kind = event["event"]
+            if kind == "shop":
+                affordable = [(price, i) for i, (_, _, price, owned) in enumerate(event["offers"], 1)
+                              if price <= event["gold"] and not owned]
+                await self.session.send([min(affordable)[1]] if affordable else [])
+            elif kind == "equip":
+                ranked = sorted(range(len(event["weapons"])), key=lambda i: -event["weapons"][i][1])
+                await self.session.send([i + 1 for i in ranked[:event["limit"]]])
+            elif kind in ("victory", "error"):
+                return event
+
+
+async def demo(count=200, metrics_port=None):
+    host = SessionHost(max_sessions=count, metrics_port=metrics_port)
+    sessions = []
+    for i in range(count):
+        party = [(f"Hero{i}", "Vanguard")] if i % 2 else [(f"A{i}", "Rogue"), (f"B{i}", "Guardian")]
+        sessions.append(host.open_session(party, seed=i))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(LocalClient(s).play() for s in sessions))
+    elapsed = time.perf_counter() - start
+    await host.shutdown()
+    wins = sum(1 for r in results if r["event"] == "victory")
+    print(f"{wins}/{count} campaigns finished in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    # python session_host.py [sessions] [metrics port]
+    asyncio.run(demo(int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else None))
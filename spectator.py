@@ -0,0 +1,246 @@
+"""
+Spectator channel: read-only watchers follow a running game through compact
+binary deltas instead of a full state dump every round.
+
+The Broadcaster keeps a mirror of what spectators last saw - HP and alive
+flag for every hero and enemy, gold for every hero. At the start of each
+tower it sends a keyframe with all of it; after each round it sends only
+the fields that changed, 9 bytes apiece. Every message is encoded once and
+the same bytes object goes to every subscriber, so a round costs one
+encode plus one append per subscriber.
+
+A subscriber that falls more than `limit` messages behind has its backlog
+replaced by a keyframe of the current state, so it catches up at once and
+memory stays bounded. Late joiners start from such a keyframe too.
+
+    broadcast = Broadcaster()
+    game.broadcast = broadcast
+    sub = broadcast.subscribe()
+    view = SpectatorView()
+    for message in sub.drain():
+        view.apply(message)
+
+    python spectator.py [subscribers] [campaigns]
+"""
+import struct
+import sys
+import time
+from collections import deque
+
+from headless import iter_campaign
+
+KEYFRAME, DELTA = 0, 1
+HP, ALIVE, GOLD = 0, 1, 2
+
+_HEAD = struct.Struct("<BHI")  # kind, tower, round
+_COUNTS = struct.Struct("<BI")  # heroes, enemies
+_HERO = struct.Struct("<iBi")  # hp, alive, gold
+_ENEMY = struct.Struct("<iB")  # hp, alive
+_RECORD = struct.Struct("<IBi")  # unit (heroes first, then enemies), field, value
+
+
+# ==================== BROADCAST ====================
+class Subscription:
+    """One spectator's queue of encoded messages"""
+    __slots__ = ("queue", "limit", "resets")
+
+    def __init__(self, limit=256):
+        self.queue = deque()
+        self.limit = limit
+        self.resets = 0  # times the backlog was collapsed into a keyframe
+
+    def drain(self):
+        """Every message waiting, oldest first"""
+        queue = self.queue
+        messages = list(queue)
+        queue.clear()
+        return messages
+
+
+class Broadcaster:
+    """Per-round delta encoder with a shared fan-out to subscribers"""
+    def __init__(self):
+        self.subscribers = []
+        self.tower = 0
+        self.round = 0
+        self.heroes = 0
+        self.hp = []  # heroes then enemies
+        self.alive = []
+        self.gold = []  # heroes only
+        self.messages = 0
+        self.bytes = 0  # encoded bytes, each message counted once
+        self._keyframe = None  # cached encoding of the mirror, None once it changes
+
+    def subscribe(self, limit=256):
+        sub = Subscription(limit)
+        if self.hp:
+            sub.queue.append(self.encode_keyframe())
+        self.subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        self.subscribers.remove(sub)
+
+    # ---------- game hooks ----------
+    def tower_start(self, game, tower):
+        """Tower start: reset the mirror and send everything"""
+        players = game.players
+        units = players + tower.enemies
+        self.tower = tower.number
+        self.round = game.last_battle_rounds
+        self.heroes = len(players)
+        self.hp = [u.attribute.health.value for u in players] + [e.hp for e in tower.enemies]
+        self.alive = [u.is_alive for u in units]
+        self.gold = [p.gold for p in players]
+        self._keyframe = None
+        self._send(self.encode_keyframe())
+
+    def round_end(self, game, tower):
+        """End of a round: send the fields that changed since the last message"""
+        hp, alive, gold = self.hp, self.alive, self.gold
+        pack = _RECORD.pack
+        records = []
+        for i, p in enumerate(game.players):
+            value = p.attribute.health.value
+            if value != hp[i]:
+                hp[i] = value
+                records.append(pack(i, HP, value))
+            if p.is_alive != alive[i]:
+                alive[i] = p.is_alive
+                records.append(pack(i, ALIVE, p.is_alive))
+            if p.gold != gold[i]:
+                gold[i] = p.gold
+                records.append(pack(i, GOLD, p.gold))
+        for i, e in enumerate(tower.enemies, self.heroes):
+            if e.hp != hp[i]:
+                hp[i] = e.hp
+                records.append(pack(i, HP, e.hp))
+            if e.is_alive != alive[i]:
+                alive[i] = e.is_alive
+                records.append(pack(i, ALIVE, e.is_alive))
+        self.round = game.last_battle_rounds
+        if records:
+            self._keyframe = None
+            self._send(_HEAD.pack(DELTA, self.tower, self.round) + b"".join(records))
+
+    # ---------- encoding ----------
+    def encode_keyframe(self):
+        """The whole mirror as one message (cached until it changes)"""
+        if self._keyframe is None:
+            heroes, hp, alive = self.heroes, self.hp, self.alive
+            parts = [_HEAD.pack(KEYFRAME, self.tower, self.round),
+                     _COUNTS.pack(heroes, len(hp) - heroes)]
+            parts += [_HERO.pack(hp[i], alive[i], self.gold[i]) for i in range(heroes)]
+            parts += [_ENEMY.pack(hp[i], alive[i]) for i in range(heroes, len(hp))]
+            self._keyframe = b"".join(parts)
+        return self._keyframe
+
+    def _send(self, data):
+        self.messages += 1
+        self.bytes += len(data)
+        for sub in self.subscribers:
+            queue = sub.queue
+            if len(queue) < sub.limit:
+                queue.append(data)
+            else:
+                queue.clear()
+                queue.append(self.encode_keyframe())
+                sub.resets += 1
+
+
+# ==================== DECODING ====================
+class SpectatorView:
+    """A spectator's copy of the game, rebuilt from broadcast messages"""
+    def __init__(self):
+        self.tower = 0
+        self.round = 0
+        self.heroes = []  # [hp, alive, gold]
+        self.enemies = []  # [hp, alive]
+
+    def apply(self, data):
+        kind, self.tower, self.round = _HEAD.unpack_from(data)
+        offset = _HEAD.size
+        if kind == KEYFRAME:
+            heroes, enemies = _COUNTS.unpack_from(data, offset)
+            offset += _COUNTS.size
+            self.heroes = [[hp, bool(alive), gold] for hp, alive, gold
+                           in _HERO.iter_unpack(data[offset:offset + heroes * _HERO.size])]
+            offset += heroes * _HERO.size
+            self.enemies = [[hp, bool(alive)] for hp, alive
+                            in _ENEMY.iter_unpack(data[offset:offset + enemies * _ENEMY.size])]
+            return
+        heroes = len(self.heroes)
+        for unit, field, value in _RECORD.iter_unpack(data[offset:]):
+            row = self.heroes[unit] if unit < heroes else self.enemies[unit - heroes]
+            row[field] = bool(value) if field == ALIVE else value
+
+    def render(self):
+        lines = [f"Tower {self.tower} - round {self.round}"]
+        for i, (hp, alive, gold) in enumerate(self.heroes):
+            lines.append(f"  Hero{i + 1}: {hp} HP, {gold} gold{'' if alive else ' (down)'}")
+        living = [hp for hp, alive in self.enemies if alive]
+        lines.append(f"  Enemies: {len(living)}/{len(self.enemies)} alive, {sum(living)} HP left")
+        return "\n".join(lines)
+
+
+# ==================== DEMO ====================
+def _full_state(game, tower):
+    """What a show_stats-style rebroadcast would send each round"""
+    lines = [f"TOWER {tower.number} - {tower.corruption}"]
+    for p in game.players:
+        health = p.attribute.health
+        lines.append(f"{p.name} ({p.player_class}) HP {health.value}/{health.max_value} "
+                     f"ATK {p.attribute.attack.value} DEF {p.attribute.defense.value} Gold {p.gold}")
+    for e in tower.enemies:
+        lines.append(f"{e.name} HP {e.hp}/{e.archetype.max_health}{'' if e.is_alive else ' DEAD'}")
+    return "\n".join(lines).encode()
+
+
+def _campaign(seed, broadcast=None, on_round=None):
+    """Rounds fought in one headless campaign of a fixed party"""
+    party = [("Hero1", "Vanguard"), ("Hero2", "Weaver"), ("Hero3", "Rogue")]
+    return sum(record["rounds"] for record in iter_campaign(party, seed, max_defeats=20,
+                                                            broadcast=broadcast, on_round=on_round)
+               if record["kind"] == "tower")
+
+
+def main():
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    campaigns = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    # One spectator reads along every yield and must always match the game
+    broadcast = Broadcaster()
+    sub = broadcast.subscribe()
+    view = SpectatorView()
+    full = [0]
+
+    def check(game, tower):
+        for message in sub.drain():
+            view.apply(message)
+        full[0] += len(_full_state(game, tower))
+        assert [h[0] for h in view.heroes] == [p.attribute.health.value for p in game.players]
+        assert [h[2] for h in view.heroes] == [p.gold for p in game.players]
+        assert [(hp, alive) for hp, alive in view.enemies] == [(e.hp, e.is_alive) for e in tower.enemies]
+
+    rounds = sum(_campaign(seed, broadcast, check) for seed in range(campaigns))
+    print(view.render())
+    print(f"{campaigns} campaigns, {rounds} rounds, spectator in step throughout")
+    print(f"{broadcast.messages} messages, {broadcast.bytes:,} bytes "
+          f"({broadcast.bytes / rounds:.0f}/round) vs {full[0]:,} bytes of full state "
+          f"({full[0] / rounds:.0f}/round)")
+
+    # Fan-out cost: the same campaigns with nobody, one and many subscribers
+    for count in (0, 1, subscribers):
+        broadcast = Broadcaster()
+        subs = [broadcast.subscribe(limit=64) for _ in range(count)]
+        start = time.perf_counter()
+        for seed in range(campaigns):
+            _campaign(seed, broadcast if count else None)
+        elapsed = time.perf_counter() - start
+        resets = sum(s.resets for s in subs)
+        print(f"{count:>5} subscriber(s): {elapsed:.3f}s"
+              + (f", {resets} backlog reset(s)" if count else " (no broadcaster)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Squad aggregation: identical enemies fought as one unit.
+
+A Squad is one EnemyArchetype with a headcount and a histogram of the HP
+values its living members have ({hp: how many}). Damage moves one member
+between histogram buckets, deaths only decrement a count, and drops are
+the archetype's drop times the headcount. A round costs time in the number
+of enemy kinds, distinct HP values and heroes, never in headcount, so a
+tower of a million minions fights as fast as a tower of ten.
+
+battle_squads() plays by the squad rule, which the object engine can play
+too: AethermoorGame(player_targeting="squad", enemy_targeting="focus_fire").
+Heroes hit a uniformly random living enemy, ranked kind by kind and then by
+HP (SquadTargeting), so one draw picks a squad and a bucket. Enemies pile
+onto the first living hero in party order, so a squad's whole volley is
+arithmetic. With the same rng seed both engines then give identical
+battles, as long as each kind is listed contiguously in the tower (every
+built-in tower is): squads strike in order of first appearance.
+
+    python squads.py [headcount]
+"""
+import random
+import sys
+import time
+
+from veil_the_ruin_oop import (AethermoorGame, CorruptedTower, BlightedMinion, JuniorGiant,
+                               BlightGiant, Vanguard, Weaver, Alchemist, Rogue, Guardian)
+
+GOLD_PER_HIT = 15  # Same as AttackBehavior.execute
+
+
+class Squad:
+    """Enemies of one archetype: a headcount and an HP histogram of the living"""
+    __slots__ = ("archetype", "size", "alive", "hp")
+
+    def __init__(self, archetype, size, hp=None):
+        self.archetype = archetype
+        self.size = size  # everyone, living or not - drops are per head
+        self.hp = dict(hp) if hp is not None else ({archetype.max_health: size} if size else {})
+        self.alive = sum(self.hp.values())
+
+    @classmethod
+    def of(cls, enemy_cls, count):
+        """count fresh enemies of an Enemy subclass, without building them"""
+        return cls(enemy_cls().archetype, count)
+
+    def hit(self, rank, dmg):
+        """Hit the rank-th living member counting from the lowest HP; True if it dies"""
+        for hp in sorted(self.hp):
+            n = self.hp[hp]
+            if rank < n:
+                break
+            rank -= n
+        if n == 1:
+            del self.hp[hp]
+        else:
+            self.hp[hp] = n - 1
+        left = hp - max(1, dmg - self.archetype.defense)
+        if left > 0:
+            self.hp[left] = self.hp.get(left, 0) + 1
+            return False
+        self.alive -= 1
+        return True
+
+    def __repr__(self):
+        return f"Squad({self.archetype.name}, {self.alive}/{self.size} alive)"
+
+
+class SquadTower:
+    """A tower whose enemies are held as squads"""
+    def __init__(self, number, squads):
+        self.number = number
+        self.corruption = "Severe"
+        self.squads = list(squads)
+        self.cleared = False
+
+    @classmethod
+    def from_tower(cls, tower):
+        """Aggregate a CorruptedTower's enemies, kinds in order of first appearance"""
+        kinds = {}
+        for e in tower.enemies:
+            entry = kinds.setdefault(e.archetype, [0, {}])
+            entry[0] += 1
+            hp = entry[1]
+            if e.is_alive:
+                hp[e.hp] = hp.get(e.hp, 0) + 1
+        squads = cls(tower.number, [Squad(a, size, hp) for a, (size, hp) in kinds.items()])
+        squads.cleared, squads.corruption = tower.cleared, tower.corruption
+        return squads
+
+    def apply_to(self, tower):
+        """Write squad HP back onto the tower's enemy objects (lowest HP first)"""
+        for squad in self.squads:
+            hps = [hp for hp in sorted(squad.hp) for _ in range(squad.hp[hp])]
+            members = [e for e in tower.enemies if e.archetype is squad.archetype]
+            for i, e in enumerate(members):
+                e.hp = hps[i] if i < len(hps) else 0
+                e.is_alive = i < len(hps)
+                e.is_defending = False
+        tower.cleared, tower.corruption = self.cleared, self.corruption
+
+    @property
+    def enemy_count(self):
+        return sum(s.size for s in self.squads)
+
+    def get_alive(self):
+        return [s for s in self.squads if s.alive]
+
+    def check_clear(self):
+        if not self.get_alive():
+            self.cleared = True
+            self.corruption = "Purified"
+
+    def calculate_tower_gold(self):
+        return sum(s.size * s.archetype.gold_drop for s in self.squads)
+
+    def essence_total(self):
+        return sum(s.size * s.archetype.essence_drop for s in self.squads)
+
+
+# ==================== BATTLE ====================
+def battle_squads(game, tower):
+    """Fight a tower by the squad rule - mirrors AethermoorGame.battle_tower.
+
+    tower is a SquadTower, or a CorruptedTower that is aggregated for the
+    fight and written back afterwards (checkpointing it like battle_steps).
+    Returns True if the tower is purified.
+    """
+    if isinstance(tower, CorruptedTower):
+        game.enter_tower(tower)
+        squads = SquadTower.from_tower(tower)
+        won = battle_squads(game, squads)
+        squads.apply_to(tower)
+        return won
+
+    rng = game.rng
+    game.last_battle_rounds = 0
+    while True:
+        alive_p = [p for p in game.players if p.is_alive]
+        attackers = [(s, s.alive) for s in tower.squads if s.alive]  # alive at round start
+
+        if not attackers:
+            tower.check_clear()
+            gold = tower.calculate_tower_gold()
+            for player in alive_p:
+                player.gold += gold
+            if game.multiplayer and alive_p:
+                each = tower.essence_total() // len(alive_p)
+                for player in alive_p:
+                    player.essence_collected += each
+            game.current_enemy = None
+            return True
+
+        if not alive_p:
+            for p in game.players:
+                p.heal(p.attribute.health.max_value)
+                p.is_alive = True
+            return False
+
+        # Heroes: one draw each, ranked squad by squad and low HP first
+        alive_e = sum(n for _, n in attackers)
+        for p in alive_p:
+            if not alive_e:
+                break
+            k = rng.randrange(alive_e)
+            for squad in tower.squads:
+                if k < squad.alive:
+                    break
+                k -= squad.alive
+            if squad.hit(k, p.attribute.attack.value):
+                alive_e -= 1
+            p.gold += GOLD_PER_HIT
+
+        game.last_battle_rounds += 1
+
+        # Enemies: each squad's volley lands on the first living hero until it falls
+        focus = iter(alive_p)
+        target = next(focus, None)
+        for squad, volley in attackers:
+            atk = squad.archetype.attack
+            while volley and target is not None:
+                health = target.attribute.health
+                dmg = max(1, atk - target.attribute.defense.value)
+                to_kill = -(-health.value // dmg)
+                if volley < to_kill:
+                    health.modify(-volley * dmg)
+                    break
+                health.modify(-health.value)
+                target.is_alive = False
+                volley -= to_kill
+                target = next(focus, None)
+
+
+# ==================== DEMO ====================
+def _party(game, classes):
+    for i, cls in enumerate(classes):
+        game.add_player(cls(f"Hero{i+1}"))
+
+
+def main():
+    headcount = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    party = [Vanguard, Weaver, Alchemist, Rogue, Guardian]
+
+    # Both engines, same seeds, squad rule: every tower must come out the same
+    start = time.perf_counter()
+    for seed in range(20):
+        games = []
+        for engine in ("objects", "squads"):
+            game = AethermoorGame(multiplayer=True, player_targeting="squad",
+                                  enemy_targeting="focus_fire", rng=random.Random(seed))
+            _party(game, party)
+            for tower in game.towers:
+                while not (game.battle_tower(tower) if engine == "objects"
+                           else battle_squads(game, tower)):
+                    pass
+            games.append(game)
+        a, b = games
+        assert [(p.gold, p.essence_collected, p.attribute.health.value) for p in a.players] == \
+               [(p.gold, p.essence_collected, p.attribute.health.value) for p in b.players]
+        assert [e.hp for t in a.towers for e in t.enemies] == [e.hp for t in b.towers for e in t.enemies]
+    print(f"20 campaigns identical on both engines ({time.perf_counter() - start:.2f}s)")
+
+    game = AethermoorGame(player_targeting="squad", enemy_targeting="focus_fire",
+                          rng=random.Random(0))
+    _party(game, party)
+    tower = SquadTower(21, [Squad.of(BlightedMinion, headcount), Squad.of(JuniorGiant, headcount // 200),
+                            Squad.of(BlightGiant, headcount // 1000)])
+    start = time.perf_counter()
+    won = battle_squads(game, tower)
+    print(f"{tower.enemy_count:,} enemies: {'won' if won else 'lost'} in "
+          f"{game.last_battle_rounds} round(s), {(time.perf_counter() - start) * 1e6:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Distributed headless sweeps: one coordinator hands out chunks of a
+parameter grid over TCP, any number of workers play them and send back
+aggregated results.
+
+A chunk is one party over a seed range, with the towers whose per-tower
+stats should be reported (campaigns always start at tower 1, since gear
+carries over). Workers pull one chunk at a time, so fast machines simply
+take more of them and throughput grows with the worker count. A chunk whose
+worker disconnects, errors or runs past chunk_timeout goes back on the
+queue, up to max_attempts times. A late reply for a chunk that has since
+been finished elsewhere is dropped, so nothing is counted twice.
+
+Messages are JSON objects framed by a 4-byte little-endian length (wire.py).
+
+    python sweep_queue.py coordinator [port] [seeds]   # then start workers
+    python sweep_queue.py worker HOST:PORT
+    python sweep_queue.py demo [workers] [seeds]       # everything on localhost
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from headless import iter_campaign
+from wire import recv, recv_blocking, send, send_blocking
+
+
+# ==================== GRID ====================
+class Chunk:
+    """One unit of work: a party, a seed range and the towers to report"""
+    __slots__ = ("id", "party", "seeds", "towers", "attempts", "done")
+
+    def __init__(self, chunk_id, party, seeds, towers=None):
+        self.id = chunk_id
+        self.party = party
+        self.seeds = seeds  # (start, stop)
+        self.towers = towers
+        self.attempts = 0
+        self.done = False
+
+    def spec(self):
+        return {"id": self.id, "party": self.party, "seeds": self.seeds, "towers": self.towers}
+
+
+def class_parties(classes, sizes=(1,)):
+    """Every class at every party size, as (name, class) lists"""
+    return [[(f"Hero{i + 1}", pclass) for i in range(size)] for pclass in classes for size in sizes]
+
+
+def make_chunks(parties, seeds, towers=None, chunk_seeds=20):
+    """Split parties x seed range into chunks of chunk_seeds campaigns"""
+    start, stop = (seeds.start, seeds.stop) if isinstance(seeds, range) else seeds
+    chunks = []
+    for party in parties:
+        for lo in range(start, stop, chunk_seeds):
+            chunks.append(Chunk(len(chunks), [list(member) for member in party],
+                                (lo, min(lo + chunk_seeds, stop)), towers))
+    return chunks
+
+
+def party_key(party):
+    return "+".join(pclass for _, pclass in party)
+
+
+# ==================== RESULTS ====================
+def run_chunk(spec, max_defeats=20):
+    """Play a chunk and reduce it to mergeable sums, keyed by party"""
+    party = [tuple(member) for member in spec["party"]]
+    towers = set(spec["towers"]) if spec["towers"] else None
+    stats = {"campaigns": 0, "victories": 0, "defeats": 0, "tower_reached": 0, "gold": 0,
+             "towers": {}}
+    for seed in range(*spec["seeds"]):
+        for record in iter_campaign(party, seed, max_defeats=max_defeats):
+            if record["kind"] == "tower":
+                if towers is None or record["tower"] in towers:
+                    row = stats["towers"].setdefault(str(record["tower"]), [0, 0, 0])
+                    row[0] += 1
+                    row[1] += record["won"]
+                    row[2] += record["rounds"]
+            else:
+                stats["campaigns"] += 1
+                stats["victories"] += record["victory"]
+                stats["defeats"] += record["defeats"]
+                stats["tower_reached"] += record["tower_reached"]
+                stats["gold"] += sum(p["gold"] for p in record["players"])
+    return {party_key(party): stats}
+
+
+def merge_results(total, part):
+    """Add one chunk's sums into the running totals"""
+    for key, stats in part.items():
+        into = total.setdefault(key, {"campaigns": 0, "victories": 0, "defeats": 0,
+                                      "tower_reached": 0, "gold": 0, "towers": {}})
+        for field, value in stats.items():
+            if field != "towers":
+                into[field] += value
+        for tower, row in stats["towers"].items():
+            acc = into["towers"].setdefault(tower, [0, 0, 0])
+            for i, value in enumerate(row):
+                acc[i] += value
+    return total
+
+
+def report(results):
+    lines = []
+    for key, s in sorted(results.items()):
+        n = s["campaigns"] or 1
+        lines.append(f"{key}: {s['campaigns']} campaigns, {s['victories'] / n:.0%} victories, "
+                     f"{s['defeats'] / n:.2f} defeats, tower {s['tower_reached'] / n:.1f} reached, "
+                     f"{s['gold'] / n:.0f} gold")
+    return "\n".join(lines)
+
+
+# ==================== COORDINATOR ====================
+class Coordinator:
+    """Serve chunks to workers over TCP and merge what they send back"""
+    def __init__(self, chunks, host="127.0.0.1", port=0, max_attempts=3, chunk_timeout=300.0):
+        self.chunks = {c.id: c for c in chunks}
+        self.host = host
+        self.port = port
+        self.max_attempts = max_attempts
+        self.chunk_timeout = chunk_timeout
+        self.results = {}
+        self.failed = []  # chunks that ran out of attempts
+        self.retries = 0
+        self.per_worker = {}  # worker name -> chunks completed
+        self.outstanding = len(self.chunks)
+        self._queue = None
+        self._finished = None
+        self._handlers = 0
+
+    async def serve(self, on_listening=None):
+        """Run until every chunk is finished or has failed for good"""
+        self._queue = asyncio.Queue()
+        self._finished = asyncio.Event()
+        for chunk in self.chunks.values():
+            self._queue.put_nowait(chunk)
+        if not self.outstanding:
+            self._finished.set()
+        server = await asyncio.start_server(self._serve_worker, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        if on_listening is not None:
+            on_listening(self)
+        async with server:
+            await self._finished.wait()
+            # Give connected workers a moment to receive their stop message
+            deadline = time.monotonic() + 2.0
+            while self._handlers and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+        return self.results
+
+    def run(self, on_listening=None):
+        return asyncio.run(self.serve(on_listening))
+
+    def _settle(self):
+        self.outstanding -= 1
+        if not self.outstanding:
+            self._finished.set()
+            for _ in range(self._handlers):
+                self._queue.put_nowait(None)  # wake idle workers so they can be stopped
+
+    def _retry(self, chunk):
+        if chunk.done:
+            return
+        if chunk.attempts >= self.max_attempts:
+            self.failed.append(chunk.id)
+            self._settle()
+        else:
+            self.retries += 1
+            self._queue.put_nowait(chunk)
+
+    async def _serve_worker(self, reader, writer):
+        self._handlers += 1
+        chunk = None
+        try:
+            name = (await recv(reader)).get("worker", "?")
+            while not self._finished.is_set():
+                chunk = await self._queue.get()
+                if chunk is None or chunk.done:
+                    chunk = None
+                    continue
+                chunk.attempts += 1
+                await send(writer, {"op": "chunk", **chunk.spec()})
+                reply = await asyncio.wait_for(recv(reader), self.chunk_timeout)
+                if reply.get("op") != "result":
+                    self._retry(chunk)
+                elif not chunk.done:
+                    chunk.done = True
+                    merge_results(self.results, reply["result"])
+                    self.per_worker[name] = self.per_worker.get(name, 0) + 1
+                    self._settle()
+                chunk = None
+            await send(writer, {"op": "stop"})
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError, ValueError):
+            pass  # worker died, hung or spoke garbage - its chunk goes back on the queue
+        finally:
+            self._handlers -= 1
+            if chunk is not None:
+                self._retry(chunk)
+            writer.close()
+
+
+# ==================== WORKER ====================
+def run_worker(host, port, name=None, crash_after=None, retry_connect=5.0):
+    """Play chunks from a coordinator until it says stop. crash_after=n makes
+    the worker die mid-chunk after n chunks (for exercising retries)."""
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    deadline = time.monotonic() + retry_connect
+    while True:
+        try:
+            sock = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+    done = 0
+    with sock:
+        send_blocking(sock, {"op": "hello", "worker": name})
+        while True:
+            try:
+                message = recv_blocking(sock)
+            except ConnectionError:
+                return done  # coordinator finished without us
+            if message["op"] != "chunk":
+                return done
+            if crash_after is not None and done >= crash_after:
+                os._exit(1)
+            try:
+                reply = {"op": "result", "id": message["id"], "result": run_chunk(message)}
+            except Exception as exc:  # report it and let the coordinator retry elsewhere
+                reply = {"op": "error", "id": message["id"], "error": repr(exc)}
+            send_blocking(sock, reply)
+            done += 1
+
+
+# ==================== CLI ====================
+def _spawn_worker(host, port, *extra):
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker",
+                             f"{host}:{port}", *extra])
+
+
+def demo(workers=4, seeds=200):
+    """Coordinator plus local worker processes; one of them crashes on purpose"""
+    parties = class_parties(["Vanguard", "Weaver", "Alchemist", "Rogue", "Guardian"])
+    chunks = make_chunks(parties, range(seeds), towers=[1, 10, 20], chunk_seeds=10)
+    coordinator = Coordinator(chunks)
+    procs = []
+
+    def launch(c):
+        for i in range(workers):
+            extra = ("--crash-after", "1") if i == 0 and workers > 1 else ()
+            procs.append(_spawn_worker(c.host, c.port, *extra))
+
+    start = time.perf_counter()
+    results = coordinator.run(launch)
+    elapsed = time.perf_counter() - start
+    for proc in procs:
+        proc.wait()
+    campaigns = sum(s["campaigns"] for s in results.values())
+    print(report(results))
+    print(f"{campaigns} campaigns in {elapsed:.2f}s ({campaigns / elapsed:.0f}/s) on {workers} worker(s); "
+          f"{len(chunks)} chunks, {coordinator.retries} retried, {len(coordinator.failed)} failed")
+
+
+def main():
+    mode = sys.argv[1] if len(sys.argv) > 1 else "demo"
+    if mode == "worker":
+        host, port = sys.argv[2].rsplit(":", 1)
+        crash_after = int(sys.argv[4]) if "--crash-after" in sys.argv[3:4] else None
+        run_worker(host, int(port), crash_after=crash_after)
+    elif mode == "coordinator":
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 9300
+        seeds = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+        parties = class_parties(["Vanguard", "Weaver", "Alchemist", "Rogue", "Guardian"], sizes=(1, 2))
+        coordinator = Coordinator(make_chunks(parties, range(seeds)), host="0.0.0.0", port=port)
+        results = coordinator.run(lambda c: print(f"Listening on port {c.port}", flush=True))
+        print(report(results))
+    else:
+        demo(int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+             int(sys.argv[3]) if len(sys.argv) > 3 else 200)
+
+
+if __name__ == "__main__":
+    main()
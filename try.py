@@ -1,20 +1,180 @@
+import contextlib
 import random
 import re
 import os
+import select
+import shutil
 import sys
 import time
+from collections import deque
+
+from input_provider import ConsoleInput, ask, fast_forward, get_input_provider
+from win_odds import battle_odds
 
 # ==================== TERMINAL UTILITIES ====================
+class Timeline:
+    """Non-blocking animation: output and pauses become timed steps in a queue.
+
+    While capturing, print() goes into the queue at the current animation
+    cursor and pause() only moves the cursor forward, so the game logic runs
+    at full speed. Steps that are due are written together as one frame
+    whenever new output arrives; sync() plays out the rest (it is called
+    before every prompt). Frames are at most fps per second, so bursts of
+    output merge into one write. time_scale 0 makes every step due immediately,
+    and skip() renders everything still queued at once - the player triggers
+    it by pressing Enter while sync() is playing. With max_backlog set, a
+    backlog longer than that many seconds is skipped automatically.
+    """
+    def __init__(self, time_scale=1.0, max_backlog=None, fps=60):
+        self.time_scale = time_scale
+        self.max_backlog = max_backlog
+        self.frame_interval = 1.0 / fps
+        self.steps = deque()  # (due, text)
+        self.cursor = 0.0
+        self.last_frame = 0.0
+        self.frames = 0
+        self.out = None
+
+    @property
+    def capturing(self):
+        return self.out is not None
+
+    def scale(self):
+        return 0.0 if fast_forward() else self.time_scale
+
+    # print() treats the timeline as a file
+    def write(self, text):
+        if text:
+            self.cursor = max(self.cursor, time.monotonic())
+            self.steps.append((self.cursor, text))
+            self.pump()
+        return len(text)
+
+    def flush(self):
+        pass  # frames are written by pump()
+
+    def isatty(self):
+        return self.out.isatty()
+
+    @property
+    def encoding(self):
+        return self.out.encoding
+
+    def wait(self, seconds):
+        now = time.monotonic()
+        self.cursor = max(self.cursor, now) + seconds * self.scale()
+        if self.max_backlog is not None and self.cursor - now > self.max_backlog:
+            self.skip()
+
+    def type_out(self, text, delay):
+        if not self.scale():
+            self.write(text + "\n")
+            return
+        for char in text:
+            self.write(char)
+            self.wait(delay)
+        self.write("\n")
+
+    def pump(self, force=False):
+        """Write every step that is due as a single frame"""
+        now = time.monotonic()
+        if not force and now - self.last_frame < self.frame_interval:
+            return
+        self.last_frame = now
+        parts = []
+        while self.steps and self.steps[0][0] <= now:
+            parts.append(self.steps.popleft()[1])
+        if parts:
+            self.out.write("".join(parts))
+            self.out.flush()
+            self.frames += 1
+
+    def sync(self):
+        """Block until everything queued has been shown; Enter skips to the end"""
+        while self.steps:
+            delay = self.steps[0][0] - time.monotonic()
+            if delay > 0 and enter_pressed(delay):
+                self.skip()
+                return
+            self.pump(force=True)
+
+    def skip(self):
+        """Show everything queued right now"""
+        if self.steps:
+            self.out.write("".join(text for _, text in self.steps))
+            self.out.flush()
+            self.steps.clear()
+            self.frames += 1
+        self.cursor = time.monotonic()
+
+    @contextlib.contextmanager
+    def capture(self):
+        self.out = sys.stdout
+        sys.stdout = self
+        try:
+            yield self
+        finally:
+            self.sync()
+            sys.stdout = self.out
+            self.out = None
+
+
+def enter_pressed(timeout):
+    """Wait up to timeout seconds; True if the player pressed Enter meanwhile.
+    Only a real console is watched - scripted input just waits."""
+    if not isinstance(get_input_provider(), ConsoleInput) or not sys.stdin.isatty():
+        time.sleep(timeout)
+        return False
+    if os.name == "nt":
+        import msvcrt
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if msvcrt.kbhit() and msvcrt.getwch() in "\r\n":
+                return True
+            time.sleep(0.01)
+        return False
+    ready, _, _ = select.select([sys.stdin], [], [], timeout)
+    if ready:
+        sys.stdin.readline()  # the terminal hands over whole lines, so this is the Enter
+        return True
+    return False
+
+
+_backlog = os.environ.get("AETHERMOOR_MAX_BACKLOG")
+TIMELINE = Timeline(time_scale=float(os.environ.get("AETHERMOOR_TIME_SCALE", "1")),
+                    max_backlog=float(_backlog) if _backlog else None)
+
+
+def read_input(prompt=""):
+    """Let the animation catch up, then ask the player"""
+    if TIMELINE.capturing:
+        TIMELINE.sync()
+    return ask(prompt)
+
 def clear_screen():
     """Clear terminal screen"""
+    if fast_forward():
+        return
+    if TIMELINE.capturing:
+        print("\033[2J\033[H", end="")
+        return
     os.system('cls' if os.name == 'nt' else 'clear')
 
 def pause(seconds=1):
     """Pause for dramatic effect"""
-    time.sleep(seconds)
+    if TIMELINE.capturing:
+        TIMELINE.wait(seconds)
+    elif not fast_forward():
+        time.sleep(seconds)
 
 def slow_print(text, delay=0.03):
     """Print text slowly for dramatic effect"""
+    if TIMELINE.capturing:
+        TIMELINE.type_out(text, delay)
+        return
+    if fast_forward():
+        print(text)
+        return
     for char in text:
         sys.stdout.write(char)
         sys.stdout.flush()
@@ -502,37 +662,78 @@ class Guardian(Player):
 
 
 # ==================== SHOP & EQUIP SYSTEM ====================
-def show_shop(player):
-    """Display all weapons in the shop for the player's class"""
-    weapons = shop_weapon_choices(player)
+class ShopVisit:
+    """One trip to the shop: offers are rolled once and reused for every redraw.
+
+    Owned flags are cached until a purchase and affordability is only
+    recomputed when gold changes, so typed numbers match the printed list.
+    """
+    def __init__(self, player):
+        self.player = player
+        self.offers = shop_weapon_choices(player)
+        self._owned = None
+        self._affordable = None
+        self._gold = None
+
+    def owned_names(self):
+        if self._owned is None:
+            self._owned = {it.name for it in self.player.inventory.items if isinstance(it, Weapon)}
+        return self._owned
+
+    def affordable(self):
+        if self._gold != self.player.gold:
+            self._gold = self.player.gold
+            self._affordable = [w.price <= self._gold for w in self.offers]
+        return self._affordable
+
+    def rows(self):
+        """(number, weapon, owned, affordable) for each offer"""
+        owned = self.owned_names()
+        return [(idx, w, w.name in owned, ok)
+                for idx, (w, ok) in enumerate(zip(self.offers, self.affordable()), 1)]
+
+    def purchase(self, weapons, total_cost):
+        self.player.gold -= total_cost
+        for weapon in weapons:
+            self.player.inventory.add(weapon)
+        self._owned = None
+
+    def cheapest_unowned(self):
+        owned = self.owned_names()
+        return min((w.price for w in self.offers if w.name not in owned), default=9999)
+
+
+def show_shop(player, visit=None):
+    """Display the weapons on offer this visit for the player's class"""
+    visit = visit or ShopVisit(player)
     clear_screen()
     print_header("⚔️  WEAPON SHOP")
     print(f"Hero: {player.name} ({player.player_class})")
     print(f"💰 Gold: {player.gold} | 💎 Essence: {player.essence_collected}\n")
     print("Available Weapons:\n")
-    for idx, w in enumerate(weapons, 1):
-        affordable = "✅" if w.price <= player.gold else "❌"
-        owned = any(it.name == w.name for it in player.inventory.items if isinstance(it, Weapon))
+    for idx, w, owned, affordable in visit.rows():
+        affordable = "✅" if affordable else "❌"
         owned_str = " (Already Owned)" if owned else ""
         print(f"{idx}. {w.name:.<40} {w.damage:>2} ATK [{w.type:>6}]")
         print(f"   {w.passive:.<40} {affordable} {w.price:>3} gold{owned_str}")
     print()
-    return weapons
+    return visit.offers
 
 
 def shop_stage(player):
     """
     Allow buying multiple weapons at once!
     """
+    visit = ShopVisit(player)
+    weapons = visit.offers
     while True:
-        weapons = shop_weapon_choices(player)
-        owned_set = {w.name for w in player.inventory.items if isinstance(w, Weapon)}
+        owned_set = set(visit.owned_names())
         
-        show_shop(player)
+        show_shop(player, visit)
         print("Enter weapon numbers to buy (e.g., 1 3 5) or (1, 3, 5) or (1 and 3 and 5)")
         print("Or press Enter to leave the shop.\n")
         
-        wchoices = input(">> Pick numbers: ").strip()
+        wchoices = read_input(">> Pick numbers: ").strip()
         
         if not wchoices:
             clear_screen()
@@ -586,9 +787,8 @@ def shop_stage(player):
         if purchases:
             clear_screen()
             print_section("✅ PURCHASES COMPLETED")
-            player.gold -= total_cost
+            visit.purchase(purchases, total_cost)
             for weapon in purchases:
-                player.inventory.add(weapon)
                 print(f"✅ Acquired: {weapon.name:.<40} +{weapon.damage} ATK")
             print(f"\n💰 Remaining gold: {player.gold}\n")
             pause(2)
@@ -597,8 +797,7 @@ def shop_stage(player):
             pause(2)
         
         # Check if player can afford anything else
-        min_price = min([w.price for w in weapons if w.name not in owned_set], default=9999)
-        if player.gold < min_price:
+        if player.gold < visit.cheapest_unowned():
             clear_screen()
             print_section("⏳ Not enough gold for more purchases")
             pause(1)
@@ -629,7 +828,7 @@ def equip_phase(player, tower_gold):
     chosen_indices = []
     for n in range(equip_limit):
         while True:
-            wchoice = input(f"Select weapon #{n+1} (1-{len(owned_weapons)}): ").strip()
+            wchoice = read_input(f"Select weapon #{n+1} (1-{len(owned_weapons)}): ").strip()
             
             # Extract number from input
             match = re.search(r'\d+', wchoice)
@@ -670,6 +869,128 @@ def equip_phase(player, tower_gold):
     pause(2)
 
 
+# ==================== BATTLE SCREEN ====================
+class BattleScreen:
+    """Battle display as a fixed status panel above a scrolling action log.
+
+    The panel (round header plus one HP bar per combatant, dead ones
+    included so rows never move) is kept as the list of lines last drawn.
+    refresh() rewrites only the rows that changed, addressing them with
+    ANSI cursor positioning, so a hit costs one row of output however many
+    enemies are on screen. The log scrolls in its own region below the
+    panel. Without a terminal, in fast-forward, or when the panel doesn't
+    fit, it falls back to reprinting every bar each round.
+    """
+    WIDTH = 75
+    ENEMY_BAR = 12
+    MIN_LOG_ROWS = 6
+
+    def __init__(self, players, enemies):
+        self.players = players
+        self.enemies = enemies
+        self.round = 0
+        self.shown = None  # panel lines currently on screen
+        self.size = None
+        self.columns = 1
+        self.incremental = False
+
+    # ---------- layout ----------
+    @staticmethod
+    def _cell(unit, name_width, bar_length):
+        return f"{unit.name[:name_width]:<{name_width}} {unit.attribute.health.get_bar(bar_length)}"
+
+    def _enemy_rows(self, columns):
+        name_width = min(18, max(len(e.name) for e in self.enemies))
+        cells = [self._cell(e, name_width, self.ENEMY_BAR) for e in self.enemies]
+        cell_width = max(len(c) for c in cells) + 2
+        return [" " + "".join(c.ljust(cell_width) for c in cells[i:i + columns]).rstrip()
+                for i in range(0, len(cells), columns)]
+
+    def _columns(self, width):
+        if not self.enemies:
+            return 1
+        name_width = min(18, max(len(e.name) for e in self.enemies))
+        widest = max(len(f"{e.attribute.health.max_value}") for e in self.enemies)
+        cell_width = name_width + self.ENEMY_BAR + 2 * widest + 7
+        return max(1, min(4, (width - 1) // cell_width))
+
+    def lines(self):
+        name_width = min(18, max(len(p.name) for p in self.players))
+        panel = ["=" * self.WIDTH, f"{'⚔️  BATTLE - ROUND ' + str(self.round):^{self.WIDTH}}",
+                 "=" * self.WIDTH, "HEROES:"]
+        panel += [" " + self._cell(p, name_width, 30) for p in self.players]
+        panel += ["ENEMIES:"]
+        if self.enemies:
+            panel += self._enemy_rows(self.columns)
+        panel += ["─" * self.WIDTH]
+        return panel
+
+    # ---------- drawing ----------
+    def open(self):
+        """Draw the whole screen and set up the log region"""
+        size = shutil.get_terminal_size()
+        self.size = size
+        self.columns = self._columns(size.columns)
+        panel = self.lines()
+        self.incremental = (not fast_forward() and sys.stdout.isatty()
+                            and len(panel) + self.MIN_LOG_ROWS <= size.lines)
+        if not self.incremental:
+            self.shown = None
+            return
+        top = len(panel) + 1
+        # clear, panel, scroll region below it, cursor into the log
+        print(f"\033[r\033[2J\033[H{chr(10).join(panel)}\033[{top};{size.lines}r\033[{top};1H",
+              end="")
+        self.shown = panel
+
+    def show_round(self, round_num):
+        """Start of a round: panel in place, or the classic full listing"""
+        self.round = round_num
+        if self.incremental and shutil.get_terminal_size() == self.size:
+            self.refresh()
+            return
+        self.open()
+        if self.incremental:
+            return
+        clear_screen()
+        print_header(f"⚔️  BATTLE - ROUND {round_num}")
+        print("HEROES:\n")
+        for p in self.players:
+            if p.is_alive:
+                p.show_stats()
+        print("\nENEMIES:\n")
+        for e in self.enemies:
+            if e.is_alive:
+                e.show_stats()
+
+    def refresh(self):
+        """Rewrite the panel rows that changed since the last draw"""
+        if not self.incremental:
+            return
+        panel = self.lines()
+        parts = [f"\033[{row};1H{line}\033[K"
+                 for row, (old, line) in enumerate(zip(self.shown, panel), 1) if old != line]
+        if parts:
+            # save the log cursor, patch the rows, put it back
+            print("\0337" + "".join(parts) + "\0338", end="")
+        self.shown = panel
+
+    def section(self, title):
+        """Start a new part of the log"""
+        if self.incremental:
+            print(f"\033[{len(self.shown) + 1};1H\033[J", end="")
+        else:
+            clear_screen()
+        print_section(title)
+
+    def close(self):
+        """Give the whole terminal back"""
+        if self.incremental:
+            print(f"\033[r\033[{self.size.lines};1H")
+        self.incremental = False
+        self.shown = None
+
+
 # ==================== TOWER CLASS ====================
 class CorruptedTower:
     """One of 20 corrupted towers"""
@@ -737,6 +1058,13 @@ class AethermoorGame:
     
     def battle_tower(self, tower):
         """Battle system with animations"""
+        screen = BattleScreen(self.players, tower.enemies)
+        try:
+            return self._fight(tower, screen)
+        finally:
+            screen.close()
+    
+    def _fight(self, tower, screen):
         round_num = 1
         
         while True:
@@ -761,36 +1089,24 @@ class AethermoorGame:
                 return False
             
             # Display battle round
-            clear_screen()
-            print_header(f"⚔️  BATTLE - ROUND {round_num}")
-            
-            # Show player stats
-            print("HEROES:\n")
-            for p in alive_p:
-                p.show_stats()
-            
-            # Show enemy stats
-            print("\nENEMIES:\n")
-            for e in alive_e:
-                e.show_stats()
+            screen.show_round(round_num)
             
             pause(1.5)
             
             # Players attack
-            clear_screen()
-            print_section("⚔️  HEROES ATTACK")
+            screen.section("⚔️  HEROES ATTACK")
             for p in alive_p:
                 if tower.get_alive():
                     target = random.choice(tower.get_alive())
                     action = p.act(target)
                     slow_print(action, delay=0.02)
+                    screen.refresh()
                     pause(0.7)
             
             pause(1)
             
             # Enemies attack
-            clear_screen()
-            print_section("🔥 ENEMIES COUNTER ATTACK")
+            screen.section("🔥 ENEMIES COUNTER ATTACK")
             for e in alive_e:
                 if alive_p:
                     target = random.choice(alive_p)
@@ -798,6 +1114,10 @@ class AethermoorGame:
                     slow_print(action, delay=0.02)
                     pause(0.7)
             
+            # One panel update for the whole counterattack: every enemy hits
+            # the same few heroes, so per-hit updates would redraw their rows
+            # again and again
+            screen.refresh()
             pause(1)
             round_num += 1
     
@@ -811,9 +1131,13 @@ class AethermoorGame:
                 print_header(f"🗼 TOWER {tower.number}/20")
                 print(f"Status: {tower.corruption}")
                 print(f"Enemies: {len(tower.enemies)}")
+                if not fast_forward():  # nobody reads the intro of a scripted run
+                    odds = battle_odds(self.players, tower.enemies, sticky_targets=True)
+                    how = "exact" if odds.exact else f"{odds.samples} simulated battles"
+                    print(f"🎲 Win chance: {odds.win:.1%} | ~{odds.expected_rounds:.0f} rounds ({how})")
                 tower_gold = tower.calculate_tower_gold()
                 print(f"💰 Gold Available: {tower_gold}\n")
-                input("Press Enter to begin battle...")
+                read_input("Press Enter to begin battle...")
                 
                 result = self.battle_tower(tower)
                 
@@ -885,6 +1209,11 @@ class AethermoorGame:
 
 # ==================== MAIN ====================
 def main():
+    with TIMELINE.capture():
+        play_session()
+
+
+def play_session():
     clear_screen()
     print_header("AETHERMOOR'S SALVATION")
     print("Mobile Legends Inspired Equipment System\n")
@@ -903,7 +1232,7 @@ def main():
             print("MODE SELECTION\n")
             print("(1) Single Player")
             print("(2) Multiplayer\n")
-            mode = int(input(">> Choose mode: "))
+            mode = int(read_input(">> Choose mode: "))
             if mode in (1, 2):
                 break
             print("❌ Please enter 1 or 2")
@@ -921,7 +1250,7 @@ def main():
         while True:
             try:
                 clear_screen()
-                num = int(input("How many players? (2-5): ") or "2")
+                num = int(read_input("How many players? (2-5): ") or "2")
                 if 2 <= num <= 5:
                     break
                 print("❌ Please enter a number between 2 and 5")
@@ -942,7 +1271,7 @@ def main():
     for i in range(num):
         clear_screen()
         print_header(f"PLAYER {i+1} - CHARACTER CREATION")
-        name = input("Enter hero name: ") or f"Hero{i+1}"
+        name = read_input("Enter hero name: ") or f"Hero{i+1}"
         
         print("\nChoose your hero:")
         print("1. Vanguard   (150 HP, 25 ATK) - Heavy Armor Tank")
@@ -951,7 +1280,7 @@ def main():
         print("4. Rogue      (80 HP, 40 ATK)  - Assassin")
         print("5. Guardian   (200 HP, 15 ATK) - Shield Master\n")
         
-        c = input(">> Select class (1-5): ") or "1"
+        c = read_input(">> Select class (1-5): ") or "1"
         
         hero = hero_classes.get(c, ("Vanguard", Vanguard))
         player = hero[1](name)
@@ -1,4 +1,11 @@
+import os
 import random
+import time
+import weakref
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
+
+from input_provider import ask
 
 class Attribute: #Base Class
     """Character stat - HP, Attack, Defense, etc."""
@@ -17,6 +24,8 @@ class Attribute: #Base Class
 
 class Behavior:  # Base Class
     """Character action patterns with description, cooldown, cost, and targeting."""
+    _shared = {}
+
     def __init__(self, 
                  name="Idle", 
                  description="Performs no action.", 
@@ -32,6 +41,14 @@ class Behavior:  # Base Class
     def execute(self, user, target=None):
         return f"{user.name} {self.name}s"
 
+    @classmethod
+    def shared(cls):
+        """Behaviors are stateless, so one instance per class serves everyone"""
+        instance = Behavior._shared.get(cls)
+        if instance is None:
+            instance = Behavior._shared[cls] = cls()
+        return instance
+
 
 class AttackBehavior(Behavior):  # Inheritance
     def __init__(self):
@@ -68,12 +85,24 @@ class DefendBehavior(Behavior):  # Inheritance
         return f"{user.name} takes a defensive stance!"
 
 class Item: #Base Class
-    """Base item class"""
+    """Base item class - frozen once it is interned in the ITEMS registry"""
+    item_id = None
+
     def __init__(self, name, effect, item_type="Misc"):
         self.name = name
         self.effect = effect
         self.type = item_type
     
+    def __setattr__(self, key, value):
+        if self.item_id is not None:
+            raise AttributeError(f"{self.name} is a shared catalog item and cannot be changed")
+        super().__setattr__(key, value)
+    
+    def __reduce__(self):
+        # Unpickled items come back as this process's shared definition
+        state = {k: v for k, v in vars(self).items() if k != "item_id"}
+        return (_restore_item, (type(self), state))
+    
     def use(self, user):
         return f"{user.name} uses {self.name}"
 
@@ -91,8 +120,7 @@ class Weapon(Item): #Inheritance
         self.price = price  # Dynamic pricing based on power
     
     def equip(self, user):
-        user.attribute.attack.modify(self.damage)
-        return f"{user.name} equips {self.name} (+{self.damage} ATK) [{self.passive}]"
+        return user.inventory.equip(self, user)
 
 
 class Armor(Item): #Inheritance
@@ -103,8 +131,7 @@ class Armor(Item): #Inheritance
         self.type = armor_type
     
     def equip(self, user):
-        user.attribute.defense.modify(self.defense)
-        return f"{user.name} equips {self.name} (+{self.defense} DEF)"
+        return user.inventory.equip(self, user)
 
 class Potion(Item): #Inheritance
     """Consumable healing"""
@@ -135,9 +162,101 @@ class EssenceOrb(Item): #Inheritance
         return f"{user.name} absorbs {self.amount} Essence! (Total: {user.essence_collected})"
 
 
+def _restore_item(cls, state):
+    item = cls.__new__(cls)
+    item.__dict__.update(state)
+    return ITEMS.intern(item)
+
+
+# ==================== ITEM REGISTRY ====================
+class ItemRegistry:
+    """Interns item definitions and gives each distinct one an integer id.
+
+    Variants (catalog items with tuned fields, see apply_content) live
+    until retire_variants(), which frees their ids for the next set, so
+    repeated tuning doesn't grow the registry.
+    """
+    def __init__(self):
+        self.by_id = []
+        self.by_key = {}
+        self.variants = {}  # item id -> registry key of each live variant
+        self._free = []  # retired variant ids, lowest last
+
+    def _key(self, item):
+        return (type(item).__name__, tuple(sorted(vars(item).items())))
+
+    def intern(self, item):
+        """Return the shared definition equal to item, registering it on first sight"""
+        if item.item_id is not None:
+            return item
+        key = self._key(item)
+        existing = self.by_key.get(key)
+        if existing is not None:
+            return existing
+        object.__setattr__(item, "item_id", len(self.by_id))
+        self.by_id.append(item)
+        self.by_key[key] = item
+        return item
+
+    def intern_all(self, items):
+        return [self.intern(item) for item in items]
+
+    def variant(self, item, **changes):
+        """The shared definition of item with some fields changed"""
+        state = {k: v for k, v in vars(item).items() if k != "item_id"}
+        state.update(changes)
+        copy = type(item).__new__(type(item))
+        copy.__dict__.update(state)
+        key = self._key(copy)
+        existing = self.by_key.get(key)
+        if existing is not None:
+            return existing
+        if self._free:
+            object.__setattr__(copy, "item_id", self._free.pop())
+            self.by_id[copy.item_id] = copy
+            self.by_key[key] = copy
+        else:
+            self.intern(copy)
+        self.variants[copy.item_id] = key
+        return copy
+
+    def retire_variants(self):
+        """Drop every variant and free its id; games holding one must be over by now"""
+        for key in self.variants.values():
+            del self.by_key[key]
+        self._free = sorted(self._free + list(self.variants), reverse=True)
+        self.variants = {}
+
+    def get(self, item_id):
+        return self.by_id[item_id]
+
+    def __len__(self):
+        return len(self.by_id)
+
+
+ITEMS = ItemRegistry()
+
+
+class OwnedItem:
+    """One player's holding of a catalog item - just the id and how many copies"""
+    __slots__ = ("item_id", "count")
+
+    def __init__(self, item_id, count=0):
+        self.item_id = item_id
+        self.count = count
+
+    @property
+    def definition(self):
+        return ITEMS.get(self.item_id)
+
+    def __repr__(self):
+        return f"OwnedItem({self.definition.name} x{self.count})"
+
+
 # ==================== WEAPON DATABASE (Mobile Legends Inspired) ====================
 
-SWORDS = [
+SWORDS = ITEMS.intern_all([
+
     Weapon("Blade of the Six Kings", 55, "Sword", "Lifesteal 10%", 150),
     Weapon("Windtalker", 40, "Sword", "Attack Speed +15%", 120),
     Weapon("Berserker's Fury", 45, "Sword", "Crit Damage +40%", 130),
@@ -150,9 +269,10 @@ SWORDS = [
     Weapon("Great Dragon Sword", 52, "Sword", "AS+10% Lifesteal 8%", 145),
     Weapon("Holy Blade", 45, "Sword", "True Damage 20", 130),
     Weapon("Wrist Slasher", 32, "Sword", "Bounce Attack", 95),
-]
+])
+
+STAFFS = ITEMS.intern_all([
 
-STAFFS = [
     Weapon("Starlium Staff", 45, "Staff", "Magic Power +30%", 130),
     Weapon("Crystal Orchid", 40, "Staff", "Cooldown 10%", 120),
     Weapon("Enchanted Talisman", 35, "Staff", "Mana Regen", 100),
@@ -165,9 +285,10 @@ STAFFS = [
     Weapon("Winter Truncheon", 38, "Staff", "Stun Immunity", 115),
     Weapon("Glowing Wand", 32, "Staff", "Burn Damage", 95),
     Weapon("Staff of the Nine Realms", 55, "Staff", "Ultimate CD-20%", 150),
-]
+])
+
+DAGGERS = ITEMS.intern_all([
 
-DAGGERS = [
     Weapon("Corrosion Dagger", 25, "Dagger", "Attack Speed +20%", 80),
     Weapon("Haas's Claws", 30, "Dagger", "Lifesteal 15%", 95),
     Weapon("Blade of Heptaseas", 28, "Dagger", "Jungle DMG 30%", 90),
@@ -178,9 +299,10 @@ DAGGERS = [
     Weapon("Death Sickle", 30, "Dagger", "Slow Effect", 95),
     Weapon("Malefic Roar", 45, "Dagger", "Physical PEN 30", 135),
     Weapon("Necklace of Durance", 25, "Dagger", "Healing Reduction 50%", 80),
-]
+])
+
+MACES = ITEMS.intern_all([
 
-MACES = [
     Weapon("War Axe", 45, "Mace", "Damage +10%", 130),
     Weapon("Cursed Helmet", 30, "Mace", "AOE Damage", 95),
     Weapon("Bloodlust Axe", 40, "Mace", "Spell Vamp 15%", 120),
@@ -191,9 +313,10 @@ MACES = [
     Weapon("Queen's Wings", 40, "Mace", "Damage Reduction 30%", 120),
     Weapon("Radiant Armor", 35, "Mace", "Counter Attack", 110),
     Weapon("Athenian Shield", 30, "Mace", "Block 50%", 95),
-]
+])
+
+SHIELDS = ITEMS.intern_all([
 
-SHIELDS = [
     Weapon("Aegis", 20, "Shield", "HP +500", 70),
     Weapon("Dominance Ice", 25, "Shield", "Attack Speed Slow", 85),
     Weapon("Antique Cuirass", 30, "Shield", "AOE Defense", 100),
@@ -204,9 +327,10 @@ SHIELDS = [
     Weapon("Dreadnought Plate", 32, "Shield", "Push Back", 105),
     Weapon("Rose's Metal", 26, "Shield", "Lifesteal Reduction", 90),
     Weapon("Athena's Shield", 30, "Shield", "Magic Shield", 100),
-]
+])
+
+BOWS = ITEMS.intern_all([
 
-BOWS = [
     Weapon("Swift Crossbow", 45, "Bow", "Attack Speed +20%", 130),
     Weapon("Demon's Bane", 50, "Bow", "VS Tank 25%", 140),
     Weapon("Windbow", 40, "Bow", "Movement Speed", 120),
@@ -215,7 +339,7 @@ BOWS = [
     Weapon("Arrow of Death", 55, "Bow", "Execute", 150),
     Weapon("Serpent's Maw", 38, "Bow", "Lifedrain", 115),
     Weapon("Berserker's Arrow", 48, "Bow", "Crit Rate +25%", 135),
-]
+])
 
 
 def get_weapon(name):
@@ -229,66 +353,108 @@ def get_weapon(name):
 
 def get_weapons_by_type(weapon_type):
     """Get weapons by type"""
-    weapons = {
-        "SWORD": SWORDS,
-        "STAFF": STAFFS,
-        "DAGGER": DAGGERS,
-        "MACE": MACES,
-        "SHIELD": SHIELDS,
-        "BOW": BOWS
-    }
-    return weapons.get(weapon_type.upper(), [])
+    return WEAPON_CATALOGS.get(weapon_type.upper(), [])
+
+
+CLASS_WEAPON_TYPES = {
+    "Vanguard": ("SWORD",),
+    "Weaver": ("STAFF",),
+    "Alchemist": ("MACE",),
+    "Rogue": ("DAGGER",),
+    "Guardian": ("SHIELD",),
+}
 
 
 def get_class_weapon_types(player):
     """Return weapon type(s) allowable for this class."""
-    return {
-        "Vanguard": ["SWORD"],
-        "Weaver": ["STAFF"],
-        "Alchemist": ["MACE"],
-        "Rogue": ["DAGGER"],
-        "Guardian": ["SHIELD"],
-    }.get(player.player_class, ["SWORD"])
+    return list(CLASS_WEAPON_TYPES.get(player.player_class, ("SWORD",)))
+
 
+class PriceIndex:
+    """A weapon list sorted by price, so gold tier cutoffs are a bisect"""
+    __slots__ = ("weapons", "prices", "first_shield")
 
-def shop_weapon_choices(player):
+    def __init__(self, weapons):
+        order = sorted(range(len(weapons)), key=lambda i: weapons[i].price)
+        self.weapons = [weapons[i] for i in order]
+        self.prices = [w.price for w in self.weapons]
+        # first_shield[k]: earliest-listed shield among the k cheapest weapons
+        self.first_shield = [None]
+        best = None
+        for i in order:
+            if weapons[i].type.upper() == "SHIELD" and (best is None or i < best):
+                best = i
+            self.first_shield.append(None if best is None else weapons[best])
+
+    def count_upto(self, price):
+        """How many weapons cost at most price"""
+        return bisect_right(self.prices, price)
+
+
+_SHOP_INDEX = {}
+
+
+def shop_index(weapon_types):
+    """PriceIndex over the weapons of these types, built on first use"""
+    key = tuple(weapon_types)
+    index = _SHOP_INDEX.get(key)
+    if index is None:
+        weapons = []
+        for wtype in key:
+            weapons.extend(get_weapons_by_type(wtype))
+        index = _SHOP_INDEX[key] = PriceIndex(weapons)
+    return index
+
+
+def clear_shop_index():
+    """Forget the price indexes - call after replacing a weapon catalog"""
+    _SHOP_INDEX.clear()
+
+
+def sample_weapons(weapons, n, k, rng=random):
+    """k random picks from weapons[:n] - a partial Fisher-Yates that only
+    touches the k drawn slots, so the cost doesn't grow with n"""
+    k = min(k, n)
+    swapped = {}
+    picks = []
+    for i in range(k):
+        j = i + int(rng.random() * (n - i))  # randrange(i, n) without its overhead
+        picks.append(weapons[swapped.get(j, j)])
+        swapped[j] = swapped.get(i, i)
+    return picks
+
+
+def shop_weapon_choices(player, rng=random):
     """Return weapons available for purchase based on player's gold."""
-    allowed_types = get_class_weapon_types(player)
-    all_weapons = []
-    
-    # Gather allowed weapons by class type
-    for wtype in allowed_types:
-        all_weapons.extend(get_weapons_by_type(wtype))
+    index = shop_index(CLASS_WEAPON_TYPES.get(player.player_class, ("SWORD",)))
     
-    # FILTER BY GOLD TIER
+    # FILTER BY GOLD TIER (the n cheapest weapons)
     if player.gold < 100:
-        filtered = [w for w in all_weapons if w.price <= player.gold + 50]
+        n = index.count_upto(player.gold + 50)
     elif player.gold < 250:
-        filtered = [w for w in all_weapons if w.price <= player.gold + 100]
+        n = index.count_upto(player.gold + 100)
     else:
-        filtered = all_weapons
+        n = len(index.weapons)
     
     # If we filtered out everything, show all anyway
-    if not filtered:
-        filtered = all_weapons
+    if not n:
+        n = len(index.weapons)
     
-    # Shuffle and limit to 8 options per shop visit
-    random.shuffle(filtered)
-    filtered = filtered[:8]
+    # Draw up to 8 options per shop visit
+    filtered = sample_weapons(index.weapons, n, 8, rng)
     
     # Always include at least 1 defense weapon
-    defense_weapons = [w for w in filtered if w.type.upper() in ['SHIELD']]
-    if not defense_weapons:
-        shield_option = [w for w in all_weapons if w.type.upper() == 'SHIELD' 
-                        and w.price <= player.gold + 100]
-        if shield_option:
-            filtered.append(shield_option[0])
+    if not any(w.type.upper() == 'SHIELD' for w in filtered):
+        shield = index.first_shield[index.count_upto(player.gold + 100)]
+        if shield is not None:
+            filtered.append(shield)
     
     return filtered
 
 
 # ==================== ARMOR DATABASE ====================
-ARMORS = [
+ARMORS = ITEMS.intern_all([
+
     Armor("Guardian Plate", 50, "Chest"),
     Armor("Crusader Emblem", 45, "Chest"),
     Armor("Twilight Armor", 40, "Chest"),
@@ -301,54 +467,148 @@ ARMORS = [
     Armor("Warrior Boots", 25, "Boots"),
     Armor("Swift Boots", 15, "Boots"),
     Armor("Demon Shoes", 20, "Boots"),
-]
+])
 
 class Inventory: #Base Class
-    """Player's equipment and items - supports multiple weapons"""
+    """Player's equipment and items - supports multiple weapons.
+
+    Items are kept in per-type buckets (insertion-ordered dicts keyed by
+    item id) with a name index, and consumables stack by count, so type
+    filters, ownership tests and potion use never scan the whole bag.
+    """
+    BUCKET_TYPES = (Weapon, Armor, Potion)
+    _bucket_of = {}  # concrete item class -> bucket key, filled lazily
+
     def __init__(self, size=20):
         self.capacity = size
-        self.items = []
+        self.size = 0  # total carried, counting every stacked copy
+        self.buckets = {cls: {} for cls in self.BUCKET_TYPES + (Item,)}
+        self.by_name = {}
+        self.owned = {}  # item_id -> OwnedItem
         self.equipped_weapons = []  # Multiple weapons can be equipped
+        self.equipped_ids = set()
         self.armor = None
         self.accessory = None
+        self.on_change = None  # called whenever the loadout changes (DerivedStats.invalidate)
+    
+    @classmethod
+    def _bucket_key(cls, item):
+        kind = type(item)
+        key = cls._bucket_of.get(kind)
+        if key is None:
+            key = next((c for c in cls.BUCKET_TYPES if issubclass(kind, c)), Item)
+            cls._bucket_of[kind] = key
+        return key
     
     def add(self, item):
-        if len(self.items) >= self.capacity:
+        if self.size >= self.capacity:
             return False
-        self.items.append(item)
+        item = ITEMS.intern(item)
+        record = self.owned.get(item.item_id)
+        if record is None:
+            record = self.owned[item.item_id] = OwnedItem(item.item_id)
+            self.buckets[self._bucket_key(item)][item.item_id] = item
+            self.by_name[item.name] = item
+        record.count += 1
+        self.size += 1
         return True
     
+    def _remove_one(self, item):
+        record = self.owned[item.item_id]
+        record.count -= 1
+        self.size -= 1
+        if not record.count:
+            del self.owned[item.item_id]
+            del self.buckets[self._bucket_key(item)][item.item_id]
+            if self.by_name.get(item.name) is item:
+                del self.by_name[item.name]
+    
+    @property
+    def items(self):
+        """Flat list of everything carried (stacked copies repeated) - for display"""
+        return [self.owned[item_id].definition
+                for bucket in self.buckets.values()
+                for item_id in bucket
+                for _ in range(self.owned[item_id].count)]
+    
+    def of_type(self, cls):
+        """Distinct items of a bucket type (Weapon, Armor, Potion or Item)"""
+        return list(self.buckets[cls].values())
+    
+    def weapons(self):
+        return self.of_type(Weapon)
+    
+    def count(self, item):
+        record = self.owned.get(item.item_id)
+        return record.count if record else 0
+    
+    def owns(self, item):
+        """O(1) ownership test by item id"""
+        return item.item_id in self.owned
+    
+    def owned_ids(self):
+        return self.owned.keys()
+    
+    def snapshot(self):
+        """Immutable copy of the contents - catalog items are shared, not copied"""
+        return (tuple((i, r.count) for i, r in self.owned.items()),
+                tuple(self.equipped_weapons), self.armor, self.accessory)
+    
+    def restore(self, state):
+        owned, equipped, self.armor, self.accessory = state
+        self.size = 0
+        self.buckets = {cls: {} for cls in self.BUCKET_TYPES + (Item,)}
+        self.by_name = {}
+        self.owned = {}
+        for item_id, count in owned:
+            item = ITEMS.get(item_id)
+            self.owned[item_id] = OwnedItem(item_id, count)
+            self.buckets[self._bucket_key(item)][item_id] = item
+            self.by_name[item.name] = item
+            self.size += count
+        self.set_equipped_weapons(equipped)
+    
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+    
+    def set_equipped_weapons(self, weapons):
+        """Replace the equipped weapon list"""
+        self.equipped_weapons = list(weapons)
+        self.equipped_ids = {w.item_id for w in self.equipped_weapons}
+        self._changed()
+    
     def equip(self, item, user):
-        """Equip an item and apply stats"""
+        """Equip an item - the owner's DerivedStats pick up the new bonuses"""
+        item = ITEMS.intern(item)
         if isinstance(item, Weapon):
             # Prevent equipping the same weapon twice
-            if any(w.name == item.name for w in self.equipped_weapons):
+            if item.item_id in self.equipped_ids:
                 return f"{user.name} already has {item.name} equipped!"
             
             self.equipped_weapons.append(item)
-            user.attribute.attack.modify(item.damage)
+            self.equipped_ids.add(item.item_id)
+            self._changed()
             return f"{user.name} equips {item.name} (+{item.damage} ATK) [{item.passive}]"
         elif isinstance(item, Armor):
-            if self.armor:
-                user.attribute.defense.modify(-self.armor.defense)
             self.armor = item
-            return item.equip(user)
-        elif isinstance(item):
-            if self.accessory:
-                user.attribute.health.modify(-self.accessory.hp_bonus)
+            self._changed()
+            return f"{user.name} equips {item.name} (+{item.defense} DEF)"
+        elif getattr(item, "hp_bonus", None) is not None:
             self.accessory = item
-            return item.equip(user)
+            self._changed()
+            return f"{user.name} equips {item.name} (+{item.hp_bonus} HP)"
         return "Cannot equip this"
     
     def use(self, name, user):
-        for item in self.items:
-            if item.name == name and isinstance(item, Potion):
-                self.items.remove(item)
-                return item.use(user)
-        return "Not found"
+        item = self.by_name.get(name)
+        if item is None or not isinstance(item, Potion):
+            return "Not found"
+        self._remove_one(item)
+        return item.use(user)
     
     def show(self):
-        print(f"\n=== INVENTORY ({len(self.items)}/{self.capacity}) ===")
+        print(f"\n=== INVENTORY ({self.size}/{self.capacity}) ===")
         if self.equipped_weapons:
             print("⚔️  Equipped Weapons:")
             for w in self.equipped_weapons:
@@ -358,9 +618,118 @@ class Inventory: #Base Class
         if self.accessory:
             print(f"Accessory: {self.accessory.name} (+{self.accessory.hp_bonus} HP)")
         print("Items:")
-        for i in self.items:
-            if not isinstance(i, (Weapon, Armor)):
-                print(f"  - {i.name}")
+        for bucket in (Potion, Item):
+            for i in self.buckets[bucket].values():
+                count = self.owned[i.item_id].count
+                print(f"  - {i.name}" + (f" x{count}" if count > 1 else ""))
+
+class Attributes:
+    """The stat block every Character carries (a plain class so games can be pickled)"""
+    def __init__(self, health, attack):
+        self.health = Attribute('HP', health, health)
+        self.attack = Attribute('ATK', attack, 100)
+        self.defense = Attribute('DEF', 10, 50)
+        self.speed = Attribute('SPD', 10, 50)
+
+
+# ==================== DERIVED STATS ====================
+class DerivedStats:
+    """A hero's effective ATK, DEF and max HP: base stats plus equipment.
+
+    Every loadout change recomputes all three from the base values and what
+    is equipped right now and writes them into the hero's attribute views.
+    Nothing is applied as a clamped delta, so the numbers stay exact however
+    often gear is swapped, and reads are plain attribute loads.
+    """
+    __slots__ = ("inventory", "attack_view", "defense_view", "health_view",
+                 "base_attack", "base_defense", "base_health", "on_change")
+
+    def __init__(self, inventory, attack, defense, health, on_change=None):
+        self.inventory = inventory
+        self.attack_view = DerivedAttribute('ATK', self, "attack")
+        self.defense_view = DerivedAttribute('DEF', self, "defense")
+        self.health_view = DerivedHealth(self, health)
+        self.base_attack = attack
+        self.base_defense = defense
+        self.base_health = health
+        self.on_change = on_change  # told about every change (e.g. to drop a compiled attack)
+        inventory.on_change = self.invalidate
+        self.invalidate()
+
+    def invalidate(self):
+        """Base stats or loadout changed: recompute the effective stats"""
+        inventory = self.inventory
+        set_ = object.__setattr__
+        set_(self.attack_view, "value", self.base_attack + sum(w.damage for w in inventory.equipped_weapons))
+        set_(self.defense_view, "value", self.base_defense + (inventory.armor.defense if inventory.armor else 0))
+        health = self.health_view
+        health.cap = self.base_health + (inventory.accessory.hp_bonus if inventory.accessory else 0)
+        if health.value > health.cap:
+            health.value = health.cap
+        if self.on_change is not None:
+            self.on_change()
+
+    def adjust(self, key, amount):
+        """Move a base stat ("attack", "defense" or "health") by amount"""
+        name = "base_" + key
+        setattr(self, name, getattr(self, name) + amount)
+        self.invalidate()
+
+    def snapshot(self):
+        return (self.base_attack, self.base_defense, self.base_health)
+
+    def restore(self, state):
+        self.base_attack, self.base_defense, self.base_health = state
+        self.invalidate()
+
+
+class DerivedAttribute(Attribute): #Inheritance
+    """ATK or DEF as computed by DerivedStats; setting it moves the base stat"""
+    def __init__(self, name, stats, key):
+        set_ = object.__setattr__
+        set_(self, "name", name)
+        set_(self, "stats", stats)
+        set_(self, "key", key)
+        set_(self, "value", 0)
+
+    def __setattr__(self, attr, amount):
+        if attr == "value":
+            self.stats.adjust(self.key, amount - self.value)
+        else:
+            object.__setattr__(self, attr, amount)
+
+    def modify(self, amount):
+        self.value = max(0, self.value + amount)
+        return self.value
+
+    def __repr__(self):
+        return f"{self.name}:{self.value}"
+
+
+class DerivedHealth(Attribute): #Inheritance
+    """Current HP is kept here as usual; max HP is computed by DerivedStats"""
+    def __init__(self, stats, health):
+        self.name = "HP"
+        self.stats = stats
+        self.value = self.cap = health
+
+    @property
+    def max_value(self):
+        return self.cap
+
+    @max_value.setter
+    def max_value(self, amount):
+        self.stats.adjust("health", amount - self.cap)
+
+
+class HeroAttributes:
+    """A hero's stat block - ATK, DEF and max HP are derived from base stats and gear"""
+    def __init__(self, stats):
+        self.health = stats.health_view
+        self.attack = stats.attack_view
+        self.defense = stats.defense_view
+        self.speed = Attribute('SPD', 10, 50)
+
 
 class Character:
     """Base class - uses Attribute and Behavior (composition)"""
@@ -370,14 +739,9 @@ class Character:
         self.is_defending = False
         
         # COMPOSITION: Character HAS-A Attribute
-        self.attribute = type('Attr', (), {
-            'health': Attribute('HP', health, health),
-            'attack': Attribute('ATK', attack, 100),
-            'defense': Attribute('DEF', 10, 50),
-            'speed': Attribute('SPD', 10, 50)
-        })()
+        self.attribute = Attributes(health, attack)
         
-        self.behavior = AttackBehavior() #Composition
+        self.behavior = AttackBehavior.shared() #Composition
     
     def take_damage(self, dmg):
         defense = self.attribute.defense.value
@@ -395,25 +759,63 @@ class Character:
     
     def act(self, target):
         return self.behavior.execute(self, target)
+    
+    @property
+    def strike(self):
+        """act() compiled to one call: strike(target) -> damage dealt, no message.
+        Subclasses cache it; here it is built fresh each time."""
+        return compile_attack(self, self.behavior, self.attribute.attack.value)
 
 
 class Player(Character): #Inheritance
     """Warrior class - uses Inventory and Weapon (composition)"""
+    # Every hero in this process, for the live-characters gauge. __new__ also
+    # runs for unpickled and copied heroes, which __init__ would miss.
+    live = weakref.WeakSet()
+    
+    def __new__(cls, *args, **kwargs):
+        hero = super().__new__(cls)
+        Player.live.add(hero)
+        return hero
+    
     def __init__(self, name, health, attack, pclass):
         super().__init__(name, health, attack)
         self.player_class = pclass
         self.essence_collected = 0
         self.gold = 0
         self.checkpoint = 1
-        self.base_attack = attack  # Store base attack for recalculation
+        self._strike = None
         
         self.inventory = Inventory() #Composition
+        # Effective stats come from base stats plus the loadout. The compiled
+        # attack folds in ATK, so every stat change drops it.
+        self.stats = DerivedStats(self.inventory, attack, self.attribute.defense.value, health,
+                                  on_change=self._drop_strike)
+        self.attribute = HeroAttributes(self.stats)
         
         # COMPOSITION: Player gets free starting weapon and EQUIPS IT IMMEDIATELY
         self.weapon = self._get_class_weapon()
         self.inventory.add(self.weapon)
         self.inventory.equip(self.weapon, self)  # Auto-equip the free starter weapon
     
+    base_attack = property(lambda self: self.stats.base_attack)
+    
+    def __getstate__(self):
+        # Closures can't be pickled, and a deep copy would share the original's
+        state = dict(self.__dict__)
+        state["_strike"] = None
+        return state
+    
+    @property
+    def strike(self):
+        strike = self._strike
+        if strike is None:
+            strike = self._strike = compile_attack(self, self.behavior, self.attribute.attack.value)
+        return strike
+    
+    def _drop_strike(self):
+        self._strike = None
+    
     def _get_class_weapon(self):
         weapons = {
             "Vanguard": ("Voidslayer", 20, "Sword"),
@@ -423,7 +825,7 @@ class Player(Character): #Inheritance
             "Guardian": ("Aegis Shield", 12, "Shield"),
         }
         w = weapons.get(self.player_class, ("Fists", 10, "None"))
-        return Weapon(w[0], w[1], w[2], price=0)  # Free starter weapon
+        return ITEMS.intern(Weapon(w[0], w[1], w[2], price=0))  # Free starter weapon
     
     def equip_item(self, item):
         """Equip item from inventory"""
@@ -435,8 +837,7 @@ class Player(Character): #Inheritance
             return f"❌ Not enough gold! Weapon costs {price}, you have: {self.gold}"
         
         # Check if player already owns this exact weapon
-        already_owned = any(w.name == weapon.name for w in self.inventory.items if isinstance(w, Weapon))
-        if already_owned:
+        if self.inventory.owns(weapon):
             return f"❌ You already own {weapon.name}!"
         
         self.gold -= price
@@ -456,30 +857,254 @@ def get_equip_limit(tower_gold):
         return 2
 
 
+class EnemyArchetype: #Flyweight
+    """Shared, immutable data for one kind of enemy - stats, drops and behavior.
+
+    Archetypes are interned: every enemy with the same stats points at the
+    same object, so a tower of 100k minions stores the static data once.
+    ATK/DEF/SPD are plain ints; to change one enemy, point it at another
+    archetype: enemy.archetype = enemy.archetype.variant(attack=42).
+    """
+    __slots__ = ("name", "max_health", "attack", "defense", "speed",
+                 "essence_drop", "gold_drop", "blight_type", "behavior", "strike")
+    _registry = {}
+
+    def __init__(self, name, health, attack, essence, gold_drop=0, blight_type="Minion"):
+        set_ = object.__setattr__
+        set_(self, "name", name)
+        set_(self, "max_health", health)
+        set_(self, "attack", attack)
+        set_(self, "defense", 10)
+        set_(self, "speed", 10)
+        set_(self, "essence_drop", essence)
+        set_(self, "gold_drop", gold_drop)
+        set_(self, "blight_type", blight_type)
+        set_(self, "behavior", AttackBehavior.shared())
+        # Every enemy of this kind attacks the same way, so they share one compiled attack
+        set_(self, "strike", compile_attack(None, self.behavior, attack))
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"EnemyArchetype is immutable (tried to set {key})")
+
+    def __reduce__(self):
+        return (EnemyArchetype.get, self._key())
+
+    def _key(self):
+        return (self.name, self.max_health, self.attack, self.essence_drop,
+                self.gold_drop, self.blight_type)
+
+    @classmethod
+    def get(cls, name, health, attack, essence, gold_drop=0, blight_type="Minion"):
+        """Return the interned archetype for these stats, creating it once"""
+        key = (name, health, attack, essence, gold_drop, blight_type)
+        archetype = cls._registry.get(key)
+        if archetype is None:
+            archetype = cls._registry[key] = cls(*key)
+        return archetype
+
+    def variant(self, **changes):
+        """The interned archetype with these get() arguments changed"""
+        name, health, attack, essence, gold_drop, blight_type = self._key()
+        key = dict(name=name, health=health, attack=attack, essence=essence,
+                   gold_drop=gold_drop, blight_type=blight_type)
+        key.update(changes)
+        return EnemyArchetype.get(**key)
+
+    def __repr__(self):
+        return f"EnemyArchetype({self.name}, HP {self.max_health}, ATK {self.attack})"
+
+
+class EnemyHealth:
+    """HP view over an enemy's per-instance hp - behaves like an Attribute"""
+    __slots__ = ("enemy",)
+    name = "HP"
+
+    def __init__(self, enemy):
+        self.enemy = enemy
+
+    @property
+    def value(self):
+        return self.enemy.hp
+
+    @value.setter
+    def value(self, amount):
+        self.enemy.hp = amount
+
+    @property
+    def max_value(self):
+        return self.enemy.archetype.max_health
+
+    def modify(self, amount):
+        enemy = self.enemy
+        enemy.hp = max(0, min(enemy.hp + amount, enemy.archetype.max_health))
+        return enemy.hp
+
+    def __repr__(self):
+        return f"{self.name}:{self.value}/{self.max_value}"
+
+
+class EnemyStat:
+    """Read-only ATK/DEF/SPD of an archetype - reads like an Attribute"""
+    __slots__ = ("name", "value", "max_value")
+
+    def __init__(self, name, value, max_value):
+        set_ = object.__setattr__
+        set_(self, "name", name)
+        set_(self, "value", value)
+        set_(self, "max_value", max_value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{self.name} is shared by every enemy of its kind - "
+                             f"use enemy.archetype.variant() to change one enemy")
+
+    def modify(self, amount):
+        self.value = self.value + amount  # Always raises, see __setattr__
+
+    def __repr__(self):
+        return f"{self.name}:{self.value}/{self.max_value}"
+
+
+class EnemyAttributes:
+    """enemy.attribute view - HP is per enemy, ATK/DEF/SPD are shared and read-only"""
+    __slots__ = ("enemy",)
+
+    def __init__(self, enemy):
+        self.enemy = enemy
+
+    @property
+    def health(self):
+        return EnemyHealth(self.enemy)
+
+    @property
+    def attack(self):
+        return EnemyStat('ATK', self.enemy.archetype.attack, 100)
+
+    @property
+    def defense(self):
+        return EnemyStat('DEF', self.enemy.archetype.defense, 50)
+
+    @property
+    def speed(self):
+        return EnemyStat('SPD', self.enemy.archetype.speed, 50)
+
+
 class Enemy(Character): #Inheritance
-    """Blighted enemy - twisted by corruption"""
+    """Blighted enemy - twisted by corruption.
+
+    Only hp, is_alive and is_defending live on the instance; everything
+    else is read through the shared EnemyArchetype (flyweight).
+    """
+    __slots__ = ("archetype", "hp", "is_alive", "is_defending")
+
     def __init__(self, name, health, attack, essence, gold_drop=0):
-        super().__init__(name, health, attack)
-        self.essence_drop = essence
-        self.gold_drop = gold_drop  # Gold dropped when defeated
-        self.blight_type = "Minion"
+        self.archetype = EnemyArchetype.get(name, health, attack, essence, gold_drop)
+        self.hp = health
+        self.is_alive = True
+        self.is_defending = False
+
+    name = property(lambda self: self.archetype.name)
+    essence_drop = property(lambda self: self.archetype.essence_drop)
+    gold_drop = property(lambda self: self.archetype.gold_drop)  # Gold dropped when defeated
+    blight_type = property(lambda self: self.archetype.blight_type)
+    behavior = property(lambda self: self.archetype.behavior)
+    strike = property(lambda self: self.archetype.strike)
+    attribute = property(EnemyAttributes)
+
+    def take_damage(self, dmg):
+        actual = max(1, dmg - self.archetype.defense)
+        if self.is_defending:
+            actual //= 2
+            self.is_defending = False
+        self.hp = max(0, self.hp - actual)
+        if self.hp <= 0:
+            self.is_alive = False
+        return actual
+
+    def heal(self, amount):
+        self.hp = min(self.hp + amount, self.archetype.max_health)
+
+
+# Enemy stat blocks - apply_content() swaps in tuned values
+ENEMY_STATS = {
+    "BlightedMinion": {"health": 40, "attack": 12, "essence": 5, "gold_drop": 20},
+    "JuniorGiant": {"health": 120, "attack": 25, "essence": 20, "gold_drop": 50},
+    "BlightGiant": {"health": 250, "attack": 40, "essence": 50, "gold_drop": 100},
+}
+
+
+# ==================== COMPILED ATTACKS ====================
+def compile_attack(user, behavior, attack):
+    """Specialize an attack into one closure: strike(target) -> damage dealt.
+
+    Folds in everything act() looks up on every hit: the behavior, the
+    attacker's ATK and the gold-on-hit rule (user is None for enemies, who
+    earn nothing). take_damage is inlined for enemies and heroes, with the
+    damage cached per enemy archetype and per hero DEF, so changing a
+    target's armor needs no invalidation. Weapon passives are display text
+    only, so there is nothing of theirs to fold in. A defending target
+    takes the ordinary take_damage path.
+    """
+    if type(behavior) is not AttackBehavior:
+        return lambda target: behavior.execute(user, target)
+    earner = user if hasattr(user, "gold") else None
+    vs_kind = {}  # enemy archetype -> damage per hit
+    vs_def = {}   # hero DEF -> damage per hit
+
+    def strike(target):
+        if target.is_defending:
+            actual = target.take_damage(attack)
+        elif isinstance(target, Enemy):
+            kind = target.archetype
+            actual = vs_kind.get(kind)
+            if actual is None:
+                actual = vs_kind[kind] = max(1, attack - kind.defense)
+            hp = target.hp - actual
+            if hp > 0:
+                target.hp = hp
+            else:
+                target.hp = 0
+                target.is_alive = False
+        else:
+            attribute = target.attribute
+            defense = attribute.defense.value
+            actual = vs_def.get(defense)
+            if actual is None:
+                actual = vs_def[defense] = max(1, attack - defense)
+            health = attribute.health
+            hp = health.value - actual
+            if hp > 0:
+                health.value = hp
+            else:
+                health.value = 0
+                target.is_alive = False
+        if earner is not None:
+            earner.gold += 15  # Earn 15 gold per hit
+        return actual
+    return strike
+
 
 class BlightedMinion(Enemy): #Inheritance
     """Twisted creatures serving the Blight"""
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__("Blighted Minion", 40, 12, essence=5, gold_drop=20)
+        super().__init__("Blighted Minion", **ENEMY_STATS["BlightedMinion"])
 
 
 class JuniorGiant(Enemy): #Inheritance
     """Towering corrupted giants"""
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__("Junior Giant", 120, 25, essence=20, gold_drop=50)
+        super().__init__("Junior Giant", **ENEMY_STATS["JuniorGiant"])
 
 
 class BlightGiant(Enemy): #Inheritance
     """Colossal anchors of darkness"""
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__("Blight Giant", 250, 40, essence=50, gold_drop=100)
+        super().__init__("Blight Giant", **ENEMY_STATS["BlightGiant"])
 
 
 class Vanguard(Player): #Inheritance
@@ -520,25 +1145,121 @@ class Guardian(Player):  # Inheritance
         self.inventory.equip(Armor("Plate Armor", 30), self)
 
 
+HERO_CLASSES = {
+    "Vanguard": Vanguard,
+    "Weaver": Weaver,
+    "Alchemist": Alchemist,
+    "Rogue": Rogue,
+    "Guardian": Guardian,
+}
+
+
+# ==================== CONTENT ====================
+WEAPON_CATALOGS = {
+    "SWORD": SWORDS,
+    "STAFF": STAFFS,
+    "DAGGER": DAGGERS,
+    "MACE": MACES,
+    "SHIELD": SHIELDS,
+    "BOW": BOWS,
+}
+_STOCK_CATALOGS = {wtype: list(catalog) for wtype, catalog in WEAPON_CATALOGS.items()}
+
+
+def content_snapshot():
+    """The tunable numbers as plain data: enemy stat blocks and weapon prices"""
+    return {
+        "enemies": {kind: dict(stats) for kind, stats in ENEMY_STATS.items()},
+        # Keyed by catalog too - a name like "Malefic Roar" appears in two
+        "weapon_prices": {wtype: {w.name: w.price for w in catalog}
+                          for wtype, catalog in WEAPON_CATALOGS.items()},
+    }
+
+
+def apply_content(content):
+    """Use tuned enemy stats and weapon prices for every game created from now on.
+
+    Repriced weapons from the previous call are retired, so finish games
+    started under the old content before applying new content.
+    """
+    for kind, stats in content.get("enemies", {}).items():
+        ENEMY_STATS[kind].update(stats)
+    prices = content.get("weapon_prices", {})
+    if prices:
+        # Catalog items are frozen, so a new price means a variant definition
+        ITEMS.retire_variants()
+        for wtype, catalog in WEAPON_CATALOGS.items():
+            tuned = prices.get(wtype) or {w.name: w.price for w in catalog}
+            catalog[:] = [w if tuned.get(w.name, w.price) == w.price else
+                          ITEMS.variant(w, price=tuned[w.name])
+                          for w in _STOCK_CATALOGS[wtype]]
+    clear_shop_index()
+
+
+def load_content(path):
+    """Apply a tuned content file written by balance_tuner.py"""
+    import json
+    with open(path) as f:
+        apply_content(json.load(f))
+
+
 # ==================== SHOP & EQUIP SYSTEM ====================
-def show_shop(player):
-    """Display all weapons in the shop for the player's class"""
-    weapons = shop_weapon_choices(player)
+class ShopVisit:
+    """One trip to the shop: the offers are rolled once and reused for every redraw.
+
+    Owned flags are cached until a purchase, and affordability is only
+    recomputed when the player's gold changes, so the numbers a player
+    types always refer to the list that was printed.
+    """
+    def __init__(self, player, rng=random):
+        self.player = player
+        self.offers = shop_weapon_choices(player, rng)
+        self._owned = None
+        self._affordable = None
+        self._gold = None
+
+    def owned(self):
+        if self._owned is None:
+            self._owned = [self.player.inventory.owns(w) for w in self.offers]
+        return self._owned
+
+    def affordable(self):
+        if self._gold != self.player.gold:
+            self._gold = self.player.gold
+            self._affordable = [w.price <= self._gold for w in self.offers]
+        return self._affordable
+
+    def rows(self):
+        """(number, weapon, owned, affordable) for each offer"""
+        return list(zip(range(1, len(self.offers) + 1), self.offers, self.owned(), self.affordable()))
+
+    def purchase(self, weapons, total_cost):
+        self.player.gold -= total_cost
+        for weapon in weapons:
+            self.player.inventory.add(weapon)
+        self._owned = None
+
+    def cheapest_unowned(self):
+        return min((w.price for w, owned in zip(self.offers, self.owned()) if not owned), default=9999)
+
+
+def show_shop(player, visit=None):
+    """Display the weapons on offer this visit for the player's class"""
+    visit = visit or ShopVisit(player)
     print("\n" + "="*75)
     print(f"⚔️  WEAPON SHOP ({player.player_class})  ⚔️")
     print(f"💰 Your Gold: {player.gold}")
     print("="*75)
-    for idx, w in enumerate(weapons, 1):
-        affordable = "✅" if w.price <= player.gold else "❌"
-        owned = any(it.name == w.name for it in player.inventory.items if isinstance(it, Weapon))
+    for idx, w, owned, affordable in visit.rows():
+        affordable = "✅" if affordable else "❌"
         owned_str = " (Already Owned)" if owned else ""
         print(f"{idx}. {w.name}")
         print(f"   └─ {w.damage} ATK [{w.type}] [{w.passive}] {affordable} {w.price} gold{owned_str}")
     print("="*75)
-    return weapons
+    return visit.offers
 
 
-def shop_stage(player):
+def shop_stage(player, rng=random, telemetry=None):
     """
     Allow buying multiple weapons at once!
     Player can enter: "1 3 5" or "1, 3, 5" or "1 and 3 and 5"
@@ -549,15 +1270,16 @@ def shop_stage(player):
     print(f"💎 Essence Collected: {player.essence_collected}")
     print(f"{'='*75}")
     
+    visit = ShopVisit(player, rng)
+    weapons = visit.offers
     while True:
-        weapons = shop_weapon_choices(player)
-        owned_set = {w.name for w in player.inventory.items if isinstance(w, Weapon)}
+        owned_set = set(player.inventory.owned_ids())
         
         print(f"\n💰 You have: {player.gold} gold")
-        show_shop(player)
+        show_shop(player, visit)
         print("Enter weapon numbers to buy (e.g., 1 3 5) or press Enter to leave.")
         
-        wchoices = input(f"Pick numbers (1-{len(weapons)}), or <Enter> to exit: ").strip()
+        wchoices = ask(f"Pick numbers (1-{len(weapons)}), or <Enter> to exit: ").strip()
         
         if not wchoices:
             print("⏭️  Left the shop.")
@@ -580,18 +1302,19 @@ def shop_stage(player):
         
         # Try to buy weapons
         purchases = []
+        chosen = set()
         total_cost = 0
         
         for n in nums:
             weapon = weapons[n - 1]
             
             # Skip if already owned
-            if weapon.name in owned_set:
+            if weapon.item_id in owned_set:
                 print(f"⏭️  {weapon.name} already owned, skipping...")
                 continue
             
             # Skip if already chosen in this round
-            if any(p.name == weapon.name for p in purchases):
+            if weapon.item_id in chosen:
                 print(f"⏭️  {weapon.name} already chosen, skipping...")
                 continue
             
@@ -603,13 +1326,16 @@ def shop_stage(player):
             # Buy the weapon
             total_cost += weapon.price
             purchases.append(weapon)
-            owned_set.add(weapon.name)
+            chosen.add(weapon.item_id)
+            owned_set.add(weapon.item_id)
         
         # Apply all purchases
         if purchases:
-            player.gold -= total_cost
-            for weapon in purchases:
-                player.inventory.add(weapon)
+            visit.purchase(purchases, total_cost)
+            if telemetry is not None:
+                for w in purchases:
+                    telemetry.event("purchase", player=player.name, item=w.name, price=w.price,
+                                    gold=player.gold)
             
             print(f"\n✅ Successfully purchased {len(purchases)} weapon(s) for {total_cost} gold!")
             for w in purchases:
@@ -619,21 +1345,26 @@ def shop_stage(player):
             print("❌ No weapons purchased in this round.\n")
         
         # Check if player can afford anything else
-        min_price = min([w.price for w in weapons if w.name not in owned_set], default=9999)
-        if player.gold < min_price:
+        if player.gold < visit.cheapest_unowned():
             print(f"⏳ Not enough gold to buy more weapons. Remaining: {player.gold}")
             break
 
 
-def equip_phase(player, tower_gold):
+def equip_weapons(player, weapons):
+    """Swap the equipped weapon set (ATK follows via DerivedStats). Returns the new bonus."""
+    player.inventory.set_equipped_weapons(weapons)
+    return sum(w.damage for w in weapons)
+
+
+def equip_phase(player, tower_gold, telemetry=None):
     """SINGLE PLAYER ONLY: Choose 2-3 weapons to equip from inventory."""
     equip_limit = get_equip_limit(tower_gold)
     
-    owned_weapons = [w for w in player.inventory.items if isinstance(w, Weapon)]
+    owned_weapons = player.inventory.weapons()
     
     if not owned_weapons:
         print("\n⚠️  You don't own any weapons yet!")
-        player.inventory.equipped_weapons = []
+        player.inventory.set_equipped_weapons([])
         return
     
     print(f"\n{'='*75}")
@@ -647,7 +1378,7 @@ def equip_phase(player, tower_gold):
     chosen_indices = []
     for n in range(equip_limit):
         while True:
-            wchoice = input(f"\nSelect weapon #{n+1} (1-{len(owned_weapons)}): ").strip()
+            wchoice = ask(f"\nSelect weapon #{n+1} (1-{len(owned_weapons)}): ").strip()
             
             # Extract number from input
             import re
@@ -667,20 +1398,10 @@ def equip_phase(player, tower_gold):
             else:
                 print(f"❌ Invalid number. Please pick between 1 and {len(owned_weapons)}.")
     
-    # Clear previous equipped weapons
-    old_equipped_bonus = sum(w.damage for w in player.inventory.equipped_weapons)
-    player.attribute.attack.modify(-old_equipped_bonus)
-    
-    # Equip new selection and stack bonuses
-    player.inventory.equipped_weapons = []
-    total_bonus = 0
-    for idx in sorted(chosen_indices):
-        weapon = owned_weapons[idx]
-        player.inventory.equipped_weapons.append(weapon)
-        total_bonus += weapon.damage
-    
-    # Apply attack bonus
-    player.attribute.attack.modify(total_bonus)
+    total_bonus = equip_weapons(player, [owned_weapons[idx] for idx in sorted(chosen_indices)])
+    if telemetry is not None:
+        telemetry.event("equip", player=player.name, attack=player.attribute.attack.value,
+                        weapons=[w.name for w in player.inventory.equipped_weapons])
     
     print(f"\n✅ Equipped Weapons:")
     for w in player.inventory.equipped_weapons:
@@ -688,14 +1409,356 @@ def equip_phase(player, tower_gold):
     print(f"\n📊 Total Attack Bonus: +{total_bonus}")
     print(f"📈 Current Attack: {player.attribute.attack.value}")
 
-        
+
+# ==================== TARGETING STRATEGIES ====================
+class IndexedMinHeap: #Base Class
+    """Binary min-heap of units with a position map, so update/remove are O(log n)"""
+    def __init__(self):
+        self.heap = []  # entries: [key, order, unit]
+        self.pos = {}   # id(unit) -> index in heap
+        self._order = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, unit):
+        return id(unit) in self.pos
+
+    def push(self, unit, key):
+        entry = [key, self._order, unit]
+        self._order += 1
+        self.heap.append(entry)
+        self.pos[id(unit)] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+
+    def peek(self):
+        return self.heap[0][2] if self.heap else None
+
+    def update(self, unit, key):
+        i = self.pos.get(id(unit))
+        if i is None:
+            return
+        old = self.heap[i][0]
+        self.heap[i][0] = key
+        if key < old:
+            self._sift_up(i)
+        elif key > old:
+            self._sift_down(i)
+
+    def remove(self, unit):
+        i = self.pos.pop(id(unit), None)
+        if i is None:
+            return
+        last = self.heap.pop()
+        if i < len(self.heap):
+            self.heap[i] = last
+            self.pos[id(last[2])] = i
+            self._sift_up(i)
+            self._sift_down(self.pos[id(last[2])])
+
+    def _swap(self, i, j):
+        heap = self.heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self.pos[id(heap[i][2])] = i
+        self.pos[id(heap[j][2])] = j
+
+    def _sift_up(self, i):
+        heap = self.heap
+        while i > 0:
+            parent = (i - 1) // 2
+            if heap[i][:2] < heap[parent][:2]:
+                self._swap(i, parent)
+                i = parent
+            else:
+                break
+
+    def _sift_down(self, i):
+        heap = self.heap
+        n = len(heap)
+        while True:
+            left = 2 * i + 1
+            smallest = i
+            if left < n and heap[left][:2] < heap[smallest][:2]:
+                smallest = left
+            if left + 1 < n and heap[left + 1][:2] < heap[smallest][:2]:
+                smallest = left + 1
+            if smallest == i:
+                break
+            self._swap(i, smallest)
+            i = smallest
+
+
+class TargetingStrategy(ABC): #Base Class
+    """Chooses who gets attacked. bind() once per battle (heroes: once per
+    round), new_round() at the start of every round, notify() after every hit."""
+    name = "base"
+
+    @abstractmethod
+    def bind(self, units):
+        """Start choosing among these units"""
+
+    def new_round(self):
+        pass
+
+    @abstractmethod
+    def pick(self, rng=random):
+        """The next target, or None if nobody is left"""
+
+    @abstractmethod
+    def notify(self, unit):
+        """unit was just hit (and may have died)"""
+
+    @abstractmethod
+    def __len__(self):
+        """How many units can still be picked"""
+
+
+class RandomTargeting(TargetingStrategy): #Inheritance
+    """Uniform random target among the units standing when the round began
+    (the classic enemy behavior: a hero who falls mid-round can still be
+    picked until the round ends) - O(1) pick, O(1) removal per casualty"""
+    name = "random"
+
+    def bind(self, units):
+        self.units = [u for u in units if u.is_alive]
+        self.index = {id(u): i for i, u in enumerate(self.units)}
+        self.fallen = []
+
+    def pick(self, rng=random):
+        return rng.choice(self.units) if self.units else None
+
+    def notify(self, unit):
+        if not unit.is_alive:
+            self.fallen.append(unit)
+
+    def new_round(self):
+        for unit in self.fallen:
+            self._remove(unit)
+        self.fallen.clear()
+
+    def _remove(self, unit):
+        i = self.index.pop(id(unit), None)
+        if i is None:
+            return
+        last = self.units.pop()
+        if i < len(self.units):
+            self.units[i] = last
+            self.index[id(last)] = i
+
+    def __len__(self):
+        return len(self.units)
+
+
+class RetargetingTargeting(RandomTargeting): #Inheritance
+    """Uniform random target among the living - casualties leave the pool at
+    once (the classic hero behavior)"""
+    name = "retarget"
+
+    def notify(self, unit):
+        if not unit.is_alive:
+            self._remove(unit)
+
+
+class LowestHPTargeting(TargetingStrategy): #Inheritance
+    """Always hit the weakest living unit - indexed min-heap on current HP"""
+    name = "lowest_hp"
+
+    def bind(self, units):
+        self.heap = IndexedMinHeap()
+        for u in units:
+            if u.is_alive:
+                self.heap.push(u, self._key(u))
+
+    def _key(self, unit):
+        return unit.attribute.health.value
+
+    def pick(self, rng=random):
+        return self.heap.peek()
+
+    def notify(self, unit):
+        if unit.is_alive:
+            self.heap.update(unit, self._key(unit))
+        else:
+            self.heap.remove(unit)
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class HighestAttackTargeting(LowestHPTargeting): #Inheritance
+    """Always hit the hardest hitter - indexed heap on negated ATK"""
+    name = "highest_attack"
+
+    def _key(self, unit):
+        return -unit.attribute.attack.value
+
+
+class FocusFireTargeting(TargetingStrategy): #Inheritance
+    """Everyone hits the same unit until it falls, then moves on in line order"""
+    name = "focus_fire"
+
+    def bind(self, units):
+        self.units = [u for u in units if u.is_alive]
+        self.living = {id(u) for u in self.units}
+        self.cursor = 0
+
+    def pick(self, rng=random):
+        # Dead units are skipped lazily, so the cursor only ever moves forward
+        while self.cursor < len(self.units) and not self.units[self.cursor].is_alive:
+            self.cursor += 1
+        return self.units[self.cursor] if self.cursor < len(self.units) else None
+
+    def notify(self, unit):
+        if not unit.is_alive:
+            self.living.discard(id(unit))
+
+    def __len__(self):
+        return len(self.living)
+
+
+class SpreadDamageTargeting(LowestHPTargeting): #Inheritance
+    """Spread hits evenly - indexed min-heap on hits taken this battle"""
+    name = "spread"
+
+    def bind(self, units):
+        self.hits = {}
+        super().bind(units)
+
+    def _key(self, unit):
+        return self.hits.get(id(unit), 0)
+
+    def notify(self, unit):
+        self.hits[id(unit)] = self.hits.get(id(unit), 0) + 1
+        super().notify(unit)
+
+
+class SquadTargeting(TargetingStrategy): #Inheritance
+    """Uniform random target, numbered kind by kind and then by HP.
+
+    Same odds as RandomTargeting, but the draw names a rank: the k-th
+    living unit counting kinds in order of first appearance and, within a
+    kind, from the lowest HP up. Units of one kind with equal HP are
+    interchangeable, so squads.py can resolve the same draw from a
+    headcount and an HP histogram.
+
+    Each kind keeps that histogram too - its sorted distinct HP values and
+    a bucket of units per value - so a pick walks kinds and distinct HPs,
+    never units, and a hit moves one unit between buckets.
+    """
+    name = "squad"
+
+    @staticmethod
+    def _kind(unit):
+        return getattr(unit, "archetype", unit)
+
+    @staticmethod
+    def _hp(unit):
+        return unit.hp if isinstance(unit, Enemy) else unit.attribute.health.value
+
+    def bind(self, units):
+        self.kinds = {}  # kind -> [living count, sorted distinct HPs, {hp: {id: unit}}]
+        self.hp_of = {}  # id(unit) -> the HP bucket it sits in
+        for u in units:
+            if u.is_alive:
+                entry = self.kinds.setdefault(self._kind(u), [0, [], {}])
+                entry[0] += 1
+                self._enter(entry, u, self._hp(u))
+        self.alive = len(self.hp_of)
+
+    def _enter(self, entry, unit, hp):
+        bucket = entry[2].get(hp)
+        if bucket is None:
+            bucket = entry[2][hp] = {}
+            insort(entry[1], hp)
+        bucket[id(unit)] = unit
+        self.hp_of[id(unit)] = hp
+
+    def pick(self, rng=random):
+        if not self.alive:
+            return None
+        k = rng.randrange(self.alive)
+        for count, hps, buckets in self.kinds.values():
+            if k < count:
+                for hp in hps:
+                    bucket = buckets[hp]
+                    if k < len(bucket):
+                        return next(iter(bucket.values()))
+                    k -= len(bucket)
+            k -= count
+
+    def notify(self, unit):
+        key = id(unit)
+        old = self.hp_of.get(key)
+        if old is None:
+            return
+        hp = self._hp(unit)
+        if unit.is_alive and hp == old:
+            return
+        entry = self.kinds[self._kind(unit)]
+        bucket = entry[2][old]
+        del bucket[key]
+        if not bucket:
+            del entry[2][old]
+            del entry[1][bisect_left(entry[1], old)]
+        if unit.is_alive:
+            self._enter(entry, unit, hp)
+        else:
+            del self.hp_of[key]
+            entry[0] -= 1
+            self.alive -= 1
+
+    def __len__(self):
+        return self.alive
+
+
+TARGETING_STRATEGIES = {
+    "random": RandomTargeting,
+    "retarget": RetargetingTargeting,
+    "lowest_hp": LowestHPTargeting,
+    "highest_attack": HighestAttackTargeting,
+    "focus_fire": FocusFireTargeting,
+    "spread": SpreadDamageTargeting,
+    "squad": SquadTargeting,
+}
+
+
+def get_targeting_strategy(strategy):
+    """Accept a strategy name or instance and return a strategy instance"""
+    if isinstance(strategy, TargetingStrategy):
+        return strategy
+    cls = TARGETING_STRATEGIES.get(str(strategy).lower())
+    if cls is None:
+        raise ValueError(f"unknown targeting strategy {strategy!r} "
+                         f"(choose from {', '.join(TARGETING_STRATEGIES)})")
+    return cls()
+
+
 class CorruptedTower:
     """One of 20 corrupted towers"""
+    # Enemies held by live towers, for the live-characters gauge. Counted per
+    # tower so the enemies themselves - thousands per campaign - need no
+    # finalizer; a tower's list is fixed once it is built.
+    live_enemies = 0
+    
     def __init__(self, number, enemies=None):
         self.number = number
         self.corruption = "Severe"
         self.enemies = enemies or []
         self.cleared = False
+        self._count_enemies()
+    
+    def __setstate__(self, state):
+        # Copies and unpickled towers skip __init__ but hold enemies too
+        self.__dict__.update(state)
+        self._count_enemies()
+    
+    def _count_enemies(self):
+        CorruptedTower.live_enemies += len(self.enemies)
+        weakref.finalize(self, CorruptedTower._forget, len(self.enemies))
+    
+    @staticmethod
+    def _forget(count):
+        CorruptedTower.live_enemies -= count
     
     def get_alive(self):
         return [e for e in self.enemies if e.is_alive]
@@ -710,15 +1773,129 @@ class CorruptedTower:
         return sum(e.gold_drop for e in self.enemies)
 
 
+# ==================== CHECKPOINTS ====================
+def player_state(p):
+    a = p.attribute
+    return (a.health.value, p.stats.snapshot(), a.speed.value, p.is_alive,
+            p.gold, p.essence_collected, p.checkpoint, p.inventory.snapshot())
+
+
+def restore_player(p, state):
+    a = p.attribute
+    (health, stats, a.speed.value, p.is_alive,
+     p.gold, p.essence_collected, p.checkpoint, inventory) = state
+    p.is_defending = False
+    p.inventory.restore(inventory)
+    p.stats.restore(stats)
+    a.health.value = health
+
+
+def tower_state(tower):
+    return (tower.cleared, tower.corruption, tuple(e.hp for e in tower.enemies))
+
+
+def restore_tower(tower, state):
+    tower.cleared, tower.corruption, hps = state
+    for enemy, hp in zip(tower.enemies, hps):
+        enemy.hp = hp
+        enemy.is_alive = hp > 0
+        enemy.is_defending = False
+
+
+class Checkpoint:
+    """Party and tower state as the party sets out for a tower.
+
+    Tower snapshots are shared with the previous checkpoint unless that
+    tower was fought since (copy-on-write), so a checkpoint costs one
+    snapshot per hero plus one per tower that changed.
+    """
+    __slots__ = ("tower_index", "players", "towers")
+
+    def __init__(self, tower_index, players, towers):
+        self.tower_index = tower_index
+        self.players = players
+        self.towers = towers
+
+
+# ==================== BATTLE LIMITS ====================
+def resolve_battle(players, enemies):
+    """True if the heroes are certain to win from here, False if they are
+    certain to lose, None while it is still open.
+
+    Works from bounds, not dice. Every hit does at least max(1, ATK - DEF)
+    against its target, so the side whose worst case still finishes the
+    other off before its own best case can kill even one of its members
+    has won, whatever the targeting. Heroes strike first in a round, so
+    they may take one enemy volley fewer than the rounds they need. A
+    defending unit halves the next hit it takes, so nothing is decided
+    while anyone is defending.
+    """
+    heroes = [(p.attribute.attack.value, p.attribute.defense.value, p.attribute.health.value)
+              for p in players if p.is_alive]
+    foes = [(e.archetype.attack, e.archetype.defense, e.hp)
+            for e in enemies if e.is_alive]
+    if not foes:
+        return True
+    if not heroes:
+        return False
+    if any(p.is_alive and p.is_defending for p in players) or \
+            any(e.is_alive and e.is_defending for e in enemies):
+        return None
+
+    # Heroes: at most this many rounds to clear with everyone standing...
+    hits = sum(-(-hp // min(max(1, atk - df) for atk, _, _ in heroes)) for _, df, hp in foes)
+    rounds = -(-hits // len(heroes))
+    # ...while the whole enemy volley needs longer than that to drop anyone
+    volley = sum(max(max(1, atk - df) for _, df, _ in heroes) for atk, _, _ in foes)
+    if (rounds - 1) * volley < min(hp for _, _, hp in heroes):
+        return True
+
+    hits = sum(-(-hp // min(max(1, atk - df) for atk, _, _ in foes)) for _, df, hp in heroes)
+    rounds = -(-hits // len(foes))
+    volley = sum(max(max(1, atk - df) for _, df, _ in foes) for atk, _, _ in heroes)
+    if rounds * volley < min(hp for _, _, hp in foes):
+        return False
+    return None
+
+
+def _side_hp(players, enemies):
+    return (sum(p.attribute.health.value for p in players if p.is_alive),
+            sum(e.hp for e in enemies if e.is_alive))
+
+
 # ==================== GAME ====================
 class AethermoorGame:
     """Main game with composition visible"""
-    def __init__(self, multiplayer=False):
+    def __init__(self, multiplayer=False, player_targeting="retarget", enemy_targeting="random",
+                 rng=None):
         self.players = []
         self.towers = []
         self.current_tower = 0
         self.multiplayer = multiplayer
         self.current_enemy = None
+        # Targeting: players pick among enemies, enemies pick among players.
+        # The defaults are the classic rules: heroes retarget as enemies fall,
+        # enemies pick from the heroes who were standing when the round began.
+        self.player_targeting = get_targeting_strategy(player_targeting)
+        self.enemy_targeting = get_targeting_strategy(enemy_targeting)
+        self.rng = rng or random  # pass a random.Random to isolate this game's dice
+        self.slice_attacks = 64  # battle_steps yields at least this often
+        # Per-tower limits for batch runs - all off by default. A battle that
+        # runs out of rounds or seconds, or stalls, counts as a defeat.
+        self.max_rounds = None  # round budget
+        self.max_seconds = None  # wall-clock budget, not counting time parked at a yield
+        self.stall_window = 0  # rounds between stall checks, 0 for none
+        self.stall_horizon = 10000  # stalled if at the current HP loss rate neither side falls within this many rounds
+        self.resolve_early = False  # end the battle once resolve_battle() settles it
+        self.last_battle_end = None  # "cleared", "wiped", "resolved", "round_budget", "time_budget" or "stalled"
+        self.leaderboard = None  # optional Leaderboard - finished campaigns are recorded
+        self.telemetry = None  # optional telemetry.Telemetry - per-event battle/shop/equip trail
+        self.metrics = None  # optional metrics.GameMetrics - live counters for a metrics endpoint
+        self.broadcast = None  # optional spectator.Broadcaster - per-round deltas for watchers
+        self.last_battle_rounds = 0
+        self.started_at = time.time()
+        self.checkpoints = []
+        self._tower_applied = []  # snapshot each tower currently matches, None if fought since
         self._build_towers()
     
     def _build_towers(self):
@@ -747,6 +1924,19 @@ class AethermoorGame:
             [JuniorGiant() for _ in range(5)] + 
             [BlightGiant(), BlightGiant()]))
 
+    def __getstate__(self):
+        # The shared `random` module can't be pickled - it is restored on load.
+        # Observers (file writers, threads, database handles) stay with the process.
+        state = dict(self.__dict__)
+        if state["rng"] is random:
+            state["rng"] = None
+        state["leaderboard"] = state["telemetry"] = state["metrics"] = state["broadcast"] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.rng = self.rng or random
+    
     def add_player(self, player):
         if len(self.players) < 5:
             self.players.append(player)
@@ -762,10 +1952,109 @@ class AethermoorGame:
         for p in alive:
             p.essence_collected += each
     
+    # ---------- checkpoints ----------
+    def save_checkpoint(self):
+        """Checkpoint the party and towers at current_tower; players respawn here"""
+        towers = []
+        for i, tower in enumerate(self.towers):
+            if i >= len(self._tower_applied):
+                self._tower_applied.append(None)
+            state = self._tower_applied[i]
+            if state is None:
+                state = self._tower_applied[i] = tower_state(tower)
+            towers.append(state)
+        for p in self.players:
+            p.checkpoint = self.current_tower + 1
+        checkpoint = Checkpoint(self.current_tower, tuple(player_state(p) for p in self.players),
+                                tuple(towers))
+        self.checkpoints.append(checkpoint)
+        return checkpoint
+    
+    def restore_checkpoint(self, checkpoint=None):
+        """Roll back to a checkpoint (the latest by default), dropping any later ones.
+        Only towers that differ from the checkpoint are touched."""
+        checkpoint = checkpoint or self.checkpoints[-1]
+        del self.checkpoints[self.checkpoints.index(checkpoint) + 1:]
+        for i, state in enumerate(checkpoint.towers):
+            if self._tower_applied[i] is not state:
+                restore_tower(self.towers[i], state)
+                self._tower_applied[i] = state
+        for p, state in zip(self.players, checkpoint.players):
+            restore_player(p, state)
+        self.current_tower = checkpoint.tower_index
+        self.current_enemy = None
+    
+    def respawn(self):
+        """After a defeat: the party is restored to the last checkpoint, fully
+        healed. The tower it lost keeps its wounded and dead enemies, so
+        every attempt wears it down further."""
+        if not self.checkpoints:
+            self.current_tower = 0
+            return
+        checkpoint = self.checkpoints[-1]
+        if self.telemetry is not None:
+            self.telemetry.event("respawn", tower=checkpoint.tower_index + 1)
+        for p, state in zip(self.players, checkpoint.players):
+            restore_player(p, state)
+            p.heal(p.attribute.health.max_value)
+            p.is_alive = True
+        self.current_tower = checkpoint.tower_index
+        self.current_enemy = None
+    
+    def enter_tower(self, tower):
+        """Checkpoint at current_tower (once) before a battle and mark tower as
+        changed. A tower that isn't one of self.towers is fought without a
+        checkpoint - there is nothing of it to restore."""
+        index = next((i for i, t in enumerate(self.towers) if t is tower), None)
+        if index is None:
+            return
+        if not self.checkpoints or self.checkpoints[-1].tower_index != self.current_tower:
+            self.save_checkpoint()
+        while len(self._tower_applied) < len(self.towers):
+            self._tower_applied.append(None)
+        self._tower_applied[index] = None  # this tower is about to change
+    
     def battle_tower(self, tower):
+        steps = self.battle_steps(tower)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as done:
+                return done.value
+    
+    def battle_steps(self, tower):
+        """battle_tower as a generator - yields after every round and every
+        slice_attacks attacks so a host can interleave many games; the
+        generator's return value is the battle result."""
+        self.enter_tower(tower)
+        
         if tower.get_alive():
             self.current_enemy = tower.get_alive()[0]
         
+        rng = self.rng
+        enemy_targets = self.player_targeting
+        hero_targets = self.enemy_targeting
+        enemy_targets.bind(tower.enemies)
+        budget = self.slice_attacks
+        self.last_battle_rounds = 0
+        self.last_battle_end = None
+        limited = (self.max_rounds is not None or self.max_seconds is not None
+                   or self.stall_window or self.resolve_early)
+        deadline = time.perf_counter() + self.max_seconds if self.max_seconds is not None else None
+        window = self.stall_window or (32 if self.resolve_early else 0)
+        stall_from = None
+        tel = self.telemetry
+        met = self.metrics
+        bc = self.broadcast
+        clock = time.perf_counter
+        if met is not None:
+            met.battles.inc()
+        if tel is not None:
+            tel.event("tower_start", tower=tower.number, enemies=len(tower.get_alive()),
+                      heroes=sum(1 for p in self.players if p.is_alive))
+        if bc is not None:
+            bc.tower_start(self, tower)
+        
         while True:
             alive_p = [p for p in self.players if p.is_alive]
             alive_e = tower.get_alive()
@@ -782,25 +2071,149 @@ class AethermoorGame:
                 if self.multiplayer:
                     self.distribute_essence(tower)
                 self.current_enemy = None
+                if met is not None:
+                    met.towers_cleared.inc()
+                self.last_battle_end = self.last_battle_end or "cleared"
+                if tel is not None:
+                    tel.event("tower_end", tower=tower.number, won=True, rounds=self.last_battle_rounds)
+                if bc is not None:
+                    bc.round_end(self, tower)
                 return True
             
             if not alive_p:
                 for p in self.players:
                     p.heal(p.attribute.health.max_value)
                     p.is_alive = True
+                self.last_battle_end = self.last_battle_end or "wiped"
+                if tel is not None:
+                    tel.event("tower_end", tower=tower.number, won=False, rounds=self.last_battle_rounds)
+                if bc is not None:
+                    bc.round_end(self, tower)
                 return False
             
+            # Round latency counts only time spent here, not time parked at a yield
+            spent = 0.0
+            started = clock() if met is not None else 0.0
+            enemy_targets.new_round()
             for p in alive_p:
-                if tower.get_alive():
-                    target = random.choice(tower.get_alive())
-                    p.act(target)
+                if enemy_targets:
+                    target = enemy_targets.pick(rng)
+                    if not target.is_alive:
+                        pass  # a round-start pool can hand out the fallen - the blow is wasted
+                    elif tel is None or tel.skip.get("attack", 0) > 0:
+                        p.strike(target)
+                        if tel is not None:
+                            tel.skip["attack"] -= 1
+                            if not target.is_alive:
+                                self._trace_death(tel, tower, target)
+                    else:
+                        self._traced_attack(tel, tower, p, target)
+                    enemy_targets.notify(target)
             
+            self.last_battle_rounds += 1
+            hero_targets.bind(alive_p)
+            left = budget
             for e in alive_e:
-                if alive_p:
-                    target = random.choice(alive_p)
-                    e.act(target)
+                if hero_targets:
+                    target = hero_targets.pick(rng)
+                    if not target.is_alive:
+                        pass  # as above: a hero who fell this round can still draw blows
+                    elif tel is None or tel.skip.get("attack", 0) > 0:
+                        e.strike(target)
+                        if tel is not None:
+                            tel.skip["attack"] -= 1
+                            if not target.is_alive:
+                                self._trace_death(tel, tower, target)
+                    else:
+                        self._traced_attack(tel, tower, e, target)
+                    hero_targets.notify(target)
+                    left -= 1
+                    if not left:
+                        left = budget
+                        if met is not None:
+                            spent += clock() - started
+                        parked = clock() if deadline is not None else 0.0
+                        yield
+                        if deadline is not None:
+                            deadline += clock() - parked
+                        if met is not None:
+                            started = clock()
+            if met is not None:
+                met.round_seconds.observe(spent + clock() - started)
+            if limited:
+                rounds = self.last_battle_rounds
+                end = None
+                if self.max_rounds is not None and rounds >= self.max_rounds:
+                    end = "round_budget"
+                elif deadline is not None and clock() > deadline:
+                    end = "time_budget"
+                elif window and rounds % window == 0:
+                    if self.resolve_early:
+                        outcome = resolve_battle(self.players, tower.enemies)
+                        if outcome is not None:
+                            end = "resolved"
+                    if end is None and self.stall_window:
+                        hp = _side_hp(self.players, tower.enemies)
+                        if stall_from is not None:
+                            # Rounds each side has left at the HP it lost over the window
+                            left = min(now / ((then - now) / window) if then > now else float("inf")
+                                       for then, now in zip(stall_from, hp))
+                            if left > self.stall_horizon:
+                                end = "stalled"
+                        stall_from = hp
+                if end is not None:
+                    self.last_battle_end = end
+                    # Settle it on the next pass through the loop: the winner's
+                    # rewards (rounds skipped pay no per-hit gold), or the usual
+                    # defeat and heal
+                    if end == "resolved" and outcome:
+                        for e in tower.enemies:
+                            e.hp = 0
+                            e.is_alive = False
+                    else:
+                        for p in self.players:
+                            p.is_alive = False
+            if bc is not None:
+                bc.round_end(self, tower)
+            yield
+    
+    def _traced_attack(self, tel, tower, attacker, target):
+        """attacker.strike(target), reporting the hit (if sampled) and any death.
+        battle_steps skips the call while the attack sampler is counting down."""
+        if tel.want("attack"):
+            before = target.attribute.health.value
+            attacker.strike(target)
+            tel.emit("attack", tower=tower.number, round=self.last_battle_rounds,
+                     attacker=attacker.name, target=target.name,
+                     damage=before - target.attribute.health.value)
+        else:
+            attacker.strike(target)
+        if not target.is_alive:
+            self._trace_death(tel, tower, target)
+    
+    def _trace_death(self, tel, tower, unit):
+        tel.event("death", tower=tower.number, round=self.last_battle_rounds, unit=unit.name,
+                  side="enemy" if isinstance(unit, Enemy) else "hero")
+    
+    def summary(self, duration=None, seed=None):
+        """Plain-dict record of this campaign (used by the leaderboard and simulations)"""
+        return {
+            "seed": seed,
+            "multiplayer": self.multiplayer,
+            "tower_reached": min(self.current_tower + 1, len(self.towers)),
+            "victory": all(t.cleared for t in self.towers),
+            "duration": time.time() - self.started_at if duration is None else duration,
+            "players": [{
+                "name": p.name,
+                "class": p.player_class,
+                "gold": p.gold,
+                "essence": p.essence_collected,
+                "equipped": [w.name for w in p.inventory.equipped_weapons],
+            } for p in self.players],
+        }
     
     def play(self):
+        self.started_at = time.time()
         while self.current_tower < len(self.towers):
             tower = self.towers[self.current_tower]
             
@@ -826,22 +2239,29 @@ class AethermoorGame:
                     if self.current_tower < 20:
                         for player in self.players:
                             if player.is_alive:
-                                shop_stage(player)
+                                shop_started = time.perf_counter()
+                                shop_stage(player, self.rng, self.telemetry)
+                                if self.metrics is not None:
+                                    self.metrics.shop_wait_seconds.observe(time.perf_counter() - shop_started)
                                 # SINGLE PLAYER ONLY: Equip phase
                                 if not self.multiplayer:
-                                    equip_phase(player, actual_gold_earned)
+                                    equip_phase(player, actual_gold_earned, self.telemetry)
                     
                     if self.current_tower == 20:
                         self._victory()
                         break
                 else:
                     print(f"\n💀 Defeated at Tower {tower.number}!")
-                    print(f"Respawning at checkpoint...")
-                    self.current_tower = max(0, self.players[0].checkpoint - 1)
+                    print(f"Respawning at checkpoint (Tower {self.players[0].checkpoint})...")
+                    self.respawn()
             else:
                 self.current_tower += 1
     
     def _victory(self):
+        if self.leaderboard is not None:
+            self.leaderboard.record(self.summary())
+            self.leaderboard.flush()
+        
         print("\n" + "="*75)
         print("🎉 AETHERMOOR IS SAVED! 🎉")
         print("="*75)
@@ -859,7 +2279,7 @@ class AethermoorGame:
             print(f"Total Gold Earned: {self.players[0].gold}")
             weapons_owned = [w.name for w in self.players[0].inventory.equipped_weapons]
             print(f"Final Equipped Weapons: {', '.join(weapons_owned) if weapons_owned else 'None'}")
-            weapons_in_inventory = [w.name for w in self.players[0].inventory.items if isinstance(w, Weapon)]
+            weapons_in_inventory = [w.name for w in self.players[0].inventory.weapons()]
             print(f"Total Weapons Collected: {len(weapons_in_inventory)} - {', '.join(weapons_in_inventory)}")
 
 
@@ -875,16 +2295,16 @@ def main():
     # Mode selection
     while True:
         try:
-            mode = int(input("Mode: (1) Single  (2) Multiplayer: "))
+            mode = int(ask("Mode: (1) Single  (2) Multiplayer: "))
             if mode in (1, 2):
                 break
-        except:
+        except ValueError:
             pass
     
     game = AethermoorGame(multiplayer=(mode == 2))
     
     # Player count
-    num = 1 if mode == 1 else max(2, min(5, int(input("Players (2-5): ") or "2")))
+    num = 1 if mode == 1 else max(2, min(5, int(ask("Players (2-5): ") or "2")))
     
     # Class selection
     hero_classes = {
@@ -897,11 +2317,11 @@ def main():
     
     for i in range(num):
         print(f"\n--- Player {i+1} ---")
-        name = input("Name: ") or f"Hero{i+1}"
+        name = ask("Name: ") or f"Hero{i+1}"
         
         print("\nChoose your hero:")
         print("1. Vanguard  2. Weaver  3. Alchemist  4. Rogue  5. Guardian")
-        c = input("Class (1-5): ") or "1"
+        c = ask("Class (1-5): ") or "1"
         
         hero = hero_classes.get(c, ("Vanguard", Vanguard))
         player = hero[1](name)
@@ -921,6 +2341,11 @@ def main():
             print("⚠️  Defeat enemies to earn gold, then buy more weapons!\n")
     
     print("\n⚔️  THE PURIFICATION BEGINS  ⚔️\n")
+    # Run history is opt-in: AETHERMOOR_DB=aethermoor_runs.db records the campaign there
+    db_path = os.environ.get("AETHERMOOR_DB")
+    if db_path:
+        from leaderboard import Leaderboard
+        game.leaderboard = Leaderboard(db_path)
     game.play()
 
 
@@ -0,0 +1,312 @@
+"""
+Exact win probability and round-count distribution for a tower battle.
+
+With random targeting on both sides, enemies that share attack and
+defense are interchangeable, so a battle state only needs the multiset of
+their HP values (one sorted tuple per enemy group) plus each hero's HP.
+The solver pushes the probability distribution over those states through
+one round at a time, one attack at a time. Identical states merge, so each
+one is expanded once. Every round costs someone HP, so the walk always
+ends. Once the distribution it is carrying holds more than max_states
+states, or it runs into the time the sampling floor needs, the solver
+gives up and falls back to Monte Carlo over the same rules: at least
+min_samples battles, then more while the budget lasts.
+
+Works on both engines: anything with .attribute.health/attack/defense and
+.is_alive. In try.py, and in veil_the_ruin_oop.py with its default "random"
+enemy targeting, enemies keep aiming at heroes who died earlier in the
+same round (sticky_targets=True); with "retarget" they don't.
+"""
+import random
+import time
+
+
+class BattleOdds:
+    """Outcome distribution of one battle"""
+    __slots__ = ("win", "loss", "rounds", "exact", "states", "samples")
+
+    def __init__(self, win, loss, rounds, exact, states=0, samples=0):
+        self.win = win
+        self.loss = loss
+        self.rounds = rounds  # {rounds fought: probability}
+        self.exact = exact
+        self.states = states
+        self.samples = samples
+
+    @property
+    def expected_rounds(self):
+        return sum(r * p for r, p in self.rounds.items())
+
+    def rounds_quantile(self, q):
+        total = 0.0
+        for r in sorted(self.rounds):
+            total += self.rounds[r]
+            if total >= q:
+                return r
+        return max(self.rounds, default=0)
+
+    def __repr__(self):
+        how = "exact" if self.exact else f"{self.samples} samples"
+        return f"BattleOdds(win={self.win:.4f}, rounds~{self.expected_rounds:.1f}, {how})"
+
+
+class StateCapExceeded(Exception):
+    """The exact solver needed more than max_states live states, or ran past its deadline"""
+
+
+# ==================== COMPRESSED BATTLE ====================
+def _combatants(players, enemies):
+    """(hero hp, atk, def) tuples and enemy groups in battle order, or None if
+    some enemy group is split up (then attack order can't be compressed)."""
+    for unit in list(players) + list(enemies):
+        if unit.is_alive and unit.is_defending:
+            return None
+    heroes = tuple((p.attribute.health.value if p.is_alive else 0,
+                    p.attribute.attack.value, p.attribute.defense.value) for p in players)
+    groups, hps, seen = [], [], set()
+    for e in enemies:
+        if not e.is_alive:
+            continue
+        kind = (e.attribute.attack.value, e.attribute.defense.value)
+        if not groups or groups[-1] != kind:
+            if kind in seen:
+                return None
+            seen.add(kind)
+            groups.append(kind)
+            hps.append([])
+        hps[-1].append(e.attribute.health.value)
+    return heroes, tuple(groups), tuple(tuple(sorted(h)) for h in hps)
+
+
+def _hit_enemy(state, g, i, dmg):
+    """state with the i-th HP value of group g reduced by dmg (dead ones leave the multiset)"""
+    enemies, heroes = state
+    group = list(enemies[g])
+    hp = group.pop(i) - dmg
+    if hp > 0:
+        group.append(hp)
+        group.sort()
+    return enemies[:g] + (tuple(group),) + enemies[g + 1:], heroes
+
+
+def _hit_hero(state, j, dmg):
+    enemies, heroes = state
+    return enemies, heroes[:j] + (max(0, heroes[j] - dmg),) + heroes[j + 1:]
+
+
+def _add(dist, state, p):
+    dist[state] = dist.get(state, 0.0) + p
+
+
+def _solve(heroes, groups, enemy_hps, sticky, max_states, deadline=None):
+    """Exact outcome distribution; raises StateCapExceeded once the
+    distribution being pushed holds more than max_states states, or once
+    perf_counter() passes deadline. The states returned count every state
+    generated along the way."""
+    if deadline is None:
+        deadline = float("inf")
+    clock = time.perf_counter
+    atk = [h[1] for h in heroes]
+    dfn = [h[2] for h in heroes]
+    frontier = {(enemy_hps, tuple(h[0] for h in heroes)): 1.0}
+    win = loss = 0.0
+    rounds = {}
+    fought = 0
+    states = 0
+    while frontier:
+        nxt = {}
+        for state, p in frontier.items():
+            enemies, hp = state
+            if not any(enemies):
+                win += p
+                rounds[fought] = rounds.get(fought, 0.0) + p
+                continue
+            if not any(hp):
+                loss += p
+                rounds[fought] = rounds.get(fought, 0.0) + p
+                continue
+            # Heroes alive now all swing, then every enemy alive now strikes back
+            acting = [j for j, v in enumerate(hp) if v]
+            attackers = [groups[g][0] for g, members in enumerate(enemies) for _ in members]
+            dist = {state: p}
+            for j in acting:
+                step = {}
+                for n, (s, q) in enumerate(dist.items()):
+                    if not n & 127 and (len(step) > max_states or clock() > deadline):
+                        raise StateCapExceeded(max_states)  # checked as it grows: one step can be long
+                    alive = sum(len(m) for m in s[0])
+                    if not alive:
+                        _add(step, s, q)
+                        continue
+                    for g, members in enumerate(s[0]):
+                        dmg = max(1, atk[j] - groups[g][1])
+                        i = 0
+                        while i < len(members):
+                            k = i
+                            while k < len(members) and members[k] == members[i]:
+                                k += 1
+                            _add(step, _hit_enemy(s, g, i, dmg), q * (k - i) / alive)
+                            i = k
+                dist = step
+                states += len(dist)
+                if len(dist) > max_states or clock() > deadline:
+                    raise StateCapExceeded(max_states)
+            for a in attackers:
+                step = {}
+                for n, (s, q) in enumerate(dist.items()):
+                    if not n & 127 and (len(step) > max_states or clock() > deadline):
+                        raise StateCapExceeded(max_states)
+                    targets = acting if sticky else [j for j, v in enumerate(s[1]) if v]
+                    if not targets:
+                        _add(step, s, q)
+                        continue
+                    share = q / len(targets)
+                    for j in targets:
+                        _add(step, _hit_hero(s, j, max(1, a - dfn[j])), share)
+                dist = step
+                states += len(dist)
+                if len(dist) > max_states or clock() > deadline:
+                    raise StateCapExceeded(max_states)
+            for s, q in dist.items():
+                _add(nxt, s, q)
+            if len(nxt) > max_states:
+                raise StateCapExceeded(max_states)
+        frontier = nxt
+        fought += 1
+    return win, loss, rounds, states
+
+
+def _sample(heroes, groups, enemy_hps, sticky, rng):
+    """Play one battle under the same rules; returns (won, rounds)"""
+    hp = [h[0] for h in heroes]
+    enemies = [[groups[g][0], groups[g][1], v] for g, members in enumerate(enemy_hps) for v in members]
+    fought = 0
+    while True:
+        alive_e = [e for e in enemies if e[2] > 0]
+        if not alive_e:
+            return True, fought
+        acting = [j for j, v in enumerate(hp) if v]
+        if not acting:
+            return False, fought
+        targets = list(alive_e)
+        for j in acting:
+            if not targets:
+                break
+            e = targets[int(rng.random() * len(targets))]
+            e[2] -= max(1, heroes[j][1] - e[1])
+            if e[2] <= 0:
+                targets.remove(e)
+        pool = list(acting)
+        for e in alive_e:
+            j = pool[int(rng.random() * len(pool))]
+            hp[j] = max(0, hp[j] - max(1, e[0] - heroes[j][2]))
+            if not hp[j] and not sticky:
+                pool.remove(j)
+                if not pool:
+                    break
+        fought += 1
+
+
+# ==================== PUBLIC API ====================
+_RESULTS = {}
+_PROBES = 4  # battles timed before solving
+
+
+def _remember(key, odds):
+    if len(_RESULTS) >= 256:
+        _RESULTS.clear()
+    _RESULTS[key] = odds
+    return odds
+
+
+def battle_odds(players, enemies, sticky_targets=False, max_states=8000,
+                samples=4000, min_samples=100, time_budget=0.08, rng=None):
+    """Win probability and round distribution for these players vs these enemies.
+
+    time_budget (seconds) is shared by the whole call. A few battles are
+    timed first; the exact solver gets what is left after the time
+    min_samples of them would take, and sampling runs min_samples battles,
+    then more (up to samples) while the budget lasts. Results are cached by
+    battle state, so asking again for the same fight (a retry after a
+    defeat, a redrawn screen) is free.
+    """
+    start = time.perf_counter()
+    compressed = _combatants(players, enemies)
+    key = (compressed, sticky_targets, max_states, samples)
+    if compressed is not None and rng is None and key in _RESULTS:
+        return _RESULTS[key]
+    sample_rng = rng or random.Random(0)
+    played = []
+    if compressed is not None:
+        # Time a few battles so the solver leaves room for the sampling floor
+        probe = time.perf_counter()
+        played = [_sample(*compressed, sticky_targets, sample_rng) for _ in range(_PROBES)]
+        floor = (time.perf_counter() - probe) / _PROBES * max(0, min_samples - _PROBES)
+        try:
+            win, loss, rounds, states = _solve(*compressed, sticky_targets, max_states,
+                                               deadline=start + time_budget - floor)
+            return _remember(key, BattleOdds(win, loss, rounds, exact=True, states=states))
+        except StateCapExceeded:
+            pass
+    else:
+        heroes = tuple((p.attribute.health.value if p.is_alive else 0,
+                        p.attribute.attack.value, p.attribute.defense.value) for p in players)
+        kinds = tuple((e.attribute.attack.value, e.attribute.defense.value)
+                      for e in enemies if e.is_alive)
+        compressed = heroes, kinds, tuple((e.attribute.health.value,)
+                                          for e in enemies if e.is_alive)
+
+    # Sampling fallback: a floor of min_samples, then whatever fits the budget
+    odds = _sampled(lambda: _sample(*compressed, sticky_targets, sample_rng),
+                    samples, min_samples, start + time_budget, played)
+    if key[0] is not None and rng is None:
+        _remember(key, odds)
+    return odds
+
+
+def _sampled(play, samples, min_samples, deadline, played=()):
+    """BattleOdds from repeated play() -> (won, rounds) calls, counting the
+    (won, rounds) results already played"""
+    wins = 0
+    rounds = {}
+    n = 0
+    for won, fought in played:
+        wins += won
+        rounds[fought] = rounds.get(fought, 0) + 1
+        n += 1
+    while n < samples and (n < max(1, min_samples) or time.perf_counter() < deadline):
+        won, fought = play()
+        wins += won
+        rounds[fought] = rounds.get(fought, 0) + 1
+        n += 1
+    return BattleOdds(wins / n, 1 - wins / n, {r: c / n for r, c in rounds.items()},
+                      exact=False, samples=n)
+
+
+def tower_odds(game, tower, **options):
+    """battle_odds for game.battle_tower(tower) in veil_the_ruin_oop.py.
+
+    Only the default targeting is modelled - heroes retargeting, enemies
+    on "random" (sticky) or "retarget"; other strategies get sampled from
+    the real engine instead, under the same samples/min_samples/time_budget
+    rules. Each trial copies only the party, the tower and the targeting
+    strategies; the rest of the game is shared, and since the copied tower
+    isn't one of game.towers the trial leaves no checkpoint behind.
+    """
+    if game.player_targeting.name == "retarget" and game.enemy_targeting.name in ("random", "retarget"):
+        options.setdefault("sticky_targets", game.enemy_targeting.name == "random")
+        return battle_odds(game.players, tower.enemies, **options)
+    import copy
+    start = time.perf_counter()
+    rng = random.Random(0)
+    combatants = (game.players, tower, game.player_targeting, game.enemy_targeting)
+
+    def play():
+        trial = copy.copy(game)
+        trial.players, trial_tower, trial.player_targeting, trial.enemy_targeting = copy.deepcopy(combatants)
+        trial.rng = rng
+        won = trial.battle_tower(trial_tower)
+        return won, trial.last_battle_rounds
+
+    return _sampled(play, options.get("samples", 500), options.get("min_samples", 100),
+                    start + options.get("time_budget", 0.08))
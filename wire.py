@@ -0,0 +1,56 @@
+"""
+Length-prefixed JSON framing shared by the TCP tools (sweep_queue.py,
+lockstep.py).
+
+Every message is one JSON object, compactly encoded and preceded by its
+size as a 4-byte little-endian unsigned int. The asyncio helpers serve the
+host/coordinator side, the blocking ones the workers and clients.
+
+    await send(writer, {"op": "hello"})
+    message = await recv(reader)
+    send_blocking(sock, message)
+"""
+import json
+import struct
+
+HEADER = struct.Struct("<I")
+
+
+def encode(message):
+    """The framed bytes for one message - encode once to send to many peers"""
+    data = json.dumps(message, separators=(",", ":")).encode()
+    return HEADER.pack(len(data)) + data
+
+
+# ==================== ASYNCIO ====================
+async def recv_frame(reader):
+    """Next message and its size on the wire, header included"""
+    (size,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return json.loads(await reader.readexactly(size)), HEADER.size + size
+
+
+async def recv(reader):
+    return (await recv_frame(reader))[0]
+
+
+async def send(writer, message):
+    writer.write(encode(message))
+    await writer.drain()
+
+
+# ==================== BLOCKING ====================
+def recv_blocking(sock):
+    def exactly(n):
+        data = b""
+        while len(data) < n:
+            part = sock.recv(n - len(data))
+            if not part:
+                raise ConnectionError("peer closed the connection")
+            data += part
+        return data
+    (size,) = HEADER.unpack(exactly(HEADER.size))
+    return json.loads(exactly(size))
+
+
+def send_blocking(sock, message):
+    sock.sendall(encode(message))